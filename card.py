@@ -1,126 +1,223 @@
 import re
-import sys
-import copy
+import textwrap
+from sys import intern
+
+# Regexes used when parsing cards. Compiled once here instead of every time
+# a card gets created.
+
+# Mana cost format
+_COST_RE = re.compile(r"^X?[1-9]?[0-9]*[WUBRGC]*$")
+# Morph and megamorph, which have a cost attached to the keyword
+_MORPH_RE = re.compile(r"Morph|Megamorph X?[1-9]?[0-9]*[WUBRGC]*")
+# Anthems of the form "(Other) <things> (you control) get +P/+T <other things>."
+_ANTHEM_RE = re.compile(r"(Other )?[\w]*s?(,? (and )?[\w]*s?)* (you control)? get [+-][1-9]{1}[0-9]*/[+-][1-9]{1}[0-9]*.*\.")
+# Same as above but without power and toughness, for anthems that only give effects
+_KW_ONLY_RE = re.compile(r"(Other )?[\w]*s?(,? (and )?[\w]*s?)* (you control)? have .*\.")
+# Comma between keywords, along with any whitespace around it
+_COMMA_SPLIT = re.compile(r"\s*,\s*")
+# Generic part of a mana cost, after an optional X
+_GENERIC_RE = re.compile(r"X?([0-9]*)")
+# Power and toughness bonus of an anthem
+_PT_RE = re.compile(r"[+-][1-9]{1}[0-9]*/[+-][1-9]{1}[0-9]*")
+
+# Colored mana symbols and the color they stand for, in WUBRG order. Each
+# color gets a bit so a card's colors can be stored as a single integer.
+_COLORS = (("W", "White"), ("U", "Blue"), ("B", "Black"), ("R", "Red"), ("G", "Green"))
+_COLOR_BITS = dict((symbol, 1 << i) for i, (symbol, name) in enumerate(_COLORS))
+_COLOR_SYMBOLS = frozenset(_COLOR_BITS)
+# Color names that have already been built, keyed on color mask
+_COLOR_NAMES = {}
+
+#------------------------------------------------------------------------------
+# Returns the name of the colors in a color mask, like "White Blue". Names get
+# cached since there are only 32 possible masks.
+#------------------------------------------------------------------------------
+def _colorName(mask):
+    name = _COLOR_NAMES.get(mask)
+    if name is None:
+        names = [color for i, (symbol, color) in enumerate(_COLORS) if mask & (1 << i)]
+        name = " ".join(names) or "Colorless"
+        _COLOR_NAMES[mask] = name
+    return name
 
 # Python class to represent a magic card. This class stores relevant
 # information like name, mana cost, type, etc. Also overrides the 
 # __str__ function to allow for printing a card to the screen.
-class Card:
+class Card(object):
+
+    # Every attribute a card can have. Saves a dict per card, which adds up
+    # with a whole deck plus tokens in play.
+    __slots__ = ('__name', '__cost', '__cmc', '__colorMask', '__type', '__subtype',
+                 '__powerMod', '__toughnessMod', '__countersMod', '__counters',
+                 '__plusone', '__summoningSickness', '__power', '__toughness',
+                 '__hasAnthem', '__anthemPower', '__anthemToughness', '__anthemType',
+                 '__anthemKeywords', '__anthemPowerBonus', '__anthemToughnessBonus',
+                 '__anthemKeywordMask', '__text', '__commander', '__flip', '__split',
+                 '__linked', '__zone', '__tapped', '__transformed', '__backSide',
+                 '__keywordsMask', '__keywordModsMask', '__facedown', '__morph',
+                 '__keywordMask', '__typeMask', '__isCreature', '__isPlaneswalker',
+                 '__powerBonus', '__toughnessBonus', '__face',
+                 '__entersTapped', '__exilesSelf', '__hasEnterTrigger', '__entersWith',
+                 '__doesntUntap',
+                 '__imageCache', '__printedName',
+                 '__moveKind', '__bodyCache', '__nameLower', '__categories')
+    # Names the slots are actually stored under, for copying cards
+    SLOT_NAMES = tuple("_Card" + name for name in __slots__)
 
     # Zone names
-    BATTLEFIELD = "Battlefield"
-    HAND = "Hand"
-    LIBRARY = "Library"
-    GRAVEYARD = "Graveyard"
-    EXILE = "Exile"
-    TOP = "Top"
-    BOTTOM = "Bottom"
-    COMMAND = "Command"
+    BATTLEFIELD = intern("Battlefield")
+    HAND = intern("Hand")
+    LIBRARY = intern("Library")
+    GRAVEYARD = intern("Graveyard")
+    EXILE = intern("Exile")
+    TOP = intern("Top")
+    BOTTOM = intern("Bottom")
+    COMMAND = intern("Command")
     
     # List in case iteration is needed
     ZONES = (BATTLEFIELD, COMMAND, EXILE, GRAVEYARD, HAND, LIBRARY, TOP, BOTTOM)
     
     # Type names
-    ARTIFACT = "Artifact"
-    CREATURE = "Creature"
-    ENCHANTMENT = "Enchantment"
-    EMBLEM = "Emblem"
-    INSTANT = "Instant"
-    LAND = "Land"
-    PLANESWALKER = "Planeswalker"
-    SNOW = "Snow"
-    SORCERY = "Sorcery"
-    TOKEN = "Token"
-    TRIBAL = "Tribal"
+    ARTIFACT = intern("Artifact")
+    CREATURE = intern("Creature")
+    ENCHANTMENT = intern("Enchantment")
+    EMBLEM = intern("Emblem")
+    INSTANT = intern("Instant")
+    LAND = intern("Land")
+    PLANESWALKER = intern("Planeswalker")
+    SNOW = intern("Snow")
+    SORCERY = intern("Sorcery")
+    TOKEN = intern("Token")
+    TRIBAL = intern("Tribal")
     
     # List to iterate over them
     TYPES = (CREATURE, PLANESWALKER, ENCHANTMENT, ARTIFACT, LAND, INSTANT, SORCERY, TOKEN, EMBLEM)
+    # Set for checking if something is a type
+    TYPES_SET = frozenset(TYPES)
+    # Bit for each type, so a card's types fit in a single integer
+    TYPE_BITS = dict((cardtype, 1 << i) for i, cardtype in enumerate(TYPES))
+    # Types that stay on the battlefield when played, and types that don't
+    PERMANENTS = TYPE_BITS[CREATURE] | TYPE_BITS[PLANESWALKER] | TYPE_BITS[ENCHANTMENT] | TYPE_BITS[ARTIFACT] | TYPE_BITS[LAND]
+    SPELLS = TYPE_BITS[INSTANT] | TYPE_BITS[SORCERY]
+    # Types that get special handling when cards move or get copied
+    TOKEN_BIT = TYPE_BITS[TOKEN]
+    EMBLEM_BIT = TYPE_BITS[EMBLEM]
+    # How a card behaves when it changes zones
+    MOVE_NORMAL = 0
+    MOVE_EMBLEM = 1
+    MOVE_COMMANDER = 2
 
     # Supertypes
-    BASIC = "Basic"
-    SNOW = "Snow"
-    LEGENDARY = "Legendary"
+    BASIC = intern("Basic")
+    SNOW = intern("Snow")
+    LEGENDARY = intern("Legendary")
     
     # List
     SUPERTYPES = (LEGENDARY, SNOW, BASIC)
+    # Set for fast membership tests
+    SUPERTYPES_SET = frozenset(SUPERTYPES)
     
     # Keywords
-    FIRSTSTRIKE = "First strike"
-    DOUBLESTRIKE = "Double strike"
-    LIFELINK = "Lifelink"
-    VIGILANCE = "Vigilance"
-    FLYING = "Flying"
-    DEATHTOUCH = "Deathtouch"
-    HASTE = "Haste"
-    TRAMPLE = "Trample"
-    HEXPROOF = "Hexproof"
-    SHROUD = "Shroud"
-    PERSIST = "Persist"
-    UNDYING = "Undying"
-    FLASH = "Flash"
-    FORESTWALK = "Forestwalk"
-    ISLANDWALK = "Islandwalk"
-    MOUNTAINWALK = "Mountainwalk"
-    PLAINSWALK = "Plainswalk"
-    SWAMPWALK = "Swampwalk"
-    NONBASICLANDWALK = "Nonbasic landwalk"
-    WITHER = "Wither"
-    INFECT = "Infect"
-    MORPH = "Morph"
-    MEGAMORPH = "Megamorph"
-    INDESTRUCTIBLE = "Indestructible"
-    SKULK = "Skulk"
-    DEFENDER = "Defender"
-    MENACE = "Menace"
-    PROWESS = "Prowess"
-    REACH = "Reach"
-    CHANGELING = "Changeling"
-    SHADOW = "Shadow"
+    FIRSTSTRIKE = intern("First strike")
+    DOUBLESTRIKE = intern("Double strike")
+    LIFELINK = intern("Lifelink")
+    VIGILANCE = intern("Vigilance")
+    FLYING = intern("Flying")
+    DEATHTOUCH = intern("Deathtouch")
+    HASTE = intern("Haste")
+    TRAMPLE = intern("Trample")
+    HEXPROOF = intern("Hexproof")
+    SHROUD = intern("Shroud")
+    PERSIST = intern("Persist")
+    UNDYING = intern("Undying")
+    FLASH = intern("Flash")
+    FORESTWALK = intern("Forestwalk")
+    ISLANDWALK = intern("Islandwalk")
+    MOUNTAINWALK = intern("Mountainwalk")
+    PLAINSWALK = intern("Plainswalk")
+    SWAMPWALK = intern("Swampwalk")
+    NONBASICLANDWALK = intern("Nonbasic landwalk")
+    WITHER = intern("Wither")
+    INFECT = intern("Infect")
+    MORPH = intern("Morph")
+    MEGAMORPH = intern("Megamorph")
+    INDESTRUCTIBLE = intern("Indestructible")
+    SKULK = intern("Skulk")
+    DEFENDER = intern("Defender")
+    MENACE = intern("Menace")
+    PROWESS = intern("Prowess")
+    REACH = intern("Reach")
+    CHANGELING = intern("Changeling")
+    SHADOW = intern("Shadow")
     
     
     # List
     KEYWORDS = (CHANGELING, DEATHTOUCH, DEFENDER, DOUBLESTRIKE, FIRSTSTRIKE, FLASH, FLYING, FORESTWALK, HASTE, HEXPROOF, INDESTRUCTIBLE, INFECT, ISLANDWALK, LIFELINK, MEGAMORPH, MENACE, MORPH, MOUNTAINWALK, PERSIST, PLAINSWALK, PROWESS, REACH, SKULK, SHADOW, SHROUD, SWAMPWALK, TRAMPLE, UNDYING, VIGILANCE, WITHER)
+    # Set for fast membership tests. Use the list above when order matters.
+    KEYWORDS_SET = frozenset(KEYWORDS)
+    # Bit for each keyword, so a card's keywords fit in a single integer
+    KEYWORD_BITS = dict((keyword, 1 << i) for i, keyword in enumerate(KEYWORDS))
+    # Checked whenever a creature enters or leaves the battlefield
+    HASTE_BIT = KEYWORD_BITS[HASTE]
+    # Either kind of morph lets a card be played face down
+    MORPH_BITS = KEYWORD_BITS[MORPH] | KEYWORD_BITS[MEGAMORPH]
+    # Keyword tuples that have already been built, keyed on keyword mask
+    KEYWORD_TUPLES = {}
+    # Everything parsed out of a card's name, cost and text, keyed on those
+    # three. Shared by every copy of the card.
+    TEMPLATES = {}
+    # Keywords and anthem parsed out of rules text, keyed on the text
+    PARSED_TEXT = {}
     
     
     # Regex to check the mana cost against
-    costPattern = re.compile("^X?[1-9]?[0-9]*[WUBRGC]*$")
+    costPattern = _COST_RE
+    # Finds every keyword in a string with a single pass. Keywords are matched
+    # in lowercase, the way they appear in the middle of rules text. The
+    # lookahead lets matches overlap so "megamorph" still finds "morph".
+    keywordPattern = re.compile("(?=(" + "|".join(re.escape(k.lower()) for k in KEYWORDS) + "))")
+    # Lowercase keyword back to its proper name
+    KEYWORD_NAMES = dict((k.lower(), k) for k in KEYWORDS)
     # Width of th card, for printing
     # 36 for Windows
     width = 36
     # Height of the card, for printing
     # 28 for Windows
     height = 28
+    # Lines of the card outline that never change
+    BORDER = " " + "-" * width + " \n"
+    DIVIDER = "|" + "-" * width + "|\n"
+    BLANK_LINE = "|" + " " * width + "|\n"
+    # Wraps rules text to fit on the card. Long words get their own line
+    # instead of being cut in half.
+    wrapper = textwrap.TextWrapper(width=width, break_long_words=False, break_on_hyphens=False)
     
     #-----------------------------------------------------------------------------------------
     # Creates a new card with all relevant information. Raises a TypeError if power/toughness
     # and counters are not integers, and also if cost doesn't match the format for mana costs.
     #-----------------------------------------------------------------------------------------
     def __init__(self, name, cost, type, subtype, power, toughness, text, transform):
-        self.__name = name
-        if self.costPattern.match(cost) or cost == "TRANSFORM":
-            self.__cost = cost
-        else:
-            raise TypeError("Mana cost for " + name + " is formatted incorrectly.")
+        self.__name = intern(name)
+        # Name printed on the card. Only differs from the name for split cards.
+        self.__printedName = self.__name
+        # Lowercase name for searching, worked out the first time it's needed
+        self.__nameLower = None
+        self.__cost = cost
+        # Last image drawn of this card. Anything that changes how the card
+        # looks has to clear it.
+        self.__imageCache = None
+        # Parts of the image that don't change with power and toughness
+        self.__bodyCache = None
         
-        # Color related things
-        self.__color = ""
-        if "W" in self.__cost:
-            self.__color += "White "
-        if "U" in self.__cost:
-            self.__color += "Blue "
-        if "B" in self.__cost:
-            self.__color += "Black "
-        if "R" in self.__cost:
-            self.__color += "Red "
-        if "G" in self.__cost:
-            self.__color += "Green "
-        if self.__color == "":
-            self.__color = "Colorless"
-        self.__color = self.__color.rstrip()
+        # Commander
+        self.__commander = False
         
         # Type and subtype
-        self.__type = type
-        self.__subtype = subtype
+        self.__type = intern(type)
+        self.__subtype = intern(subtype)
+        # Lowercase types, subtypes, and colors, worked out when first needed
+        self.__categories = None
+        self.__refreshTypeFlags()
         
         # Power, toughness, and counters
         self.__powerMod = 0
@@ -129,7 +226,10 @@ class Card:
         self.__counters = 0
         self.__plusone = 0
         self.__summoningSickness = False
-        if Card.CREATURE in self.__type:
+        # Every slot gets a value, even if only creatures use it
+        self.__power = 0
+        self.__toughness = 0
+        if self.__isCreature:
             self.__power = int(power)
             self.__toughness = int(toughness)
             self.__summoningSickness = True
@@ -141,19 +241,19 @@ class Card:
         self.__anthemPower = 0
         self.__anthemToughness = 0
         self.__anthemType = list()
-        self.__anthemKeywords = list()
+        self.__anthemKeywords = ()
         
         # Bonuses this card gets from other anthems
         self.__anthemPowerBonus = 0
         self.__anthemToughnessBonus = 0
-        self.__anthemKeywordMod = list()
+        self.__anthemKeywordMask = 0
+        # Sum of all the modifiers to power and toughness
+        self.__powerBonus = 0
+        self.__toughnessBonus = 0
         
         # Rules text
         self.__text = text.replace("\\", "\n")
         
-        # Commander
-        self.__commander = False
-        
         # Flip and split card stuff
         self.__flip = False
         self.__split = False
@@ -172,15 +272,64 @@ class Card:
         else:
             self.__backSide = None
         
-        self.__keywords = list()
-        self.__keywordMods = list()
-        self.__parseText()
+        self.__keywordsMask = 0
+        self.__keywordModsMask = 0
+        
+        # Everything that comes from the name, cost and text. Decks have lots
+        # of copies of the same card, so each printing only gets parsed once
+        # and the results are shared.
+        key = (name, cost, self.__text)
+        template = Card.TEMPLATES.get(key)
+        if template is None:
+            self.__parseCost()
+            self.__parseText()
+            # Things that happen when this card is played
+            self.__entersTapped = self.__name + " enters the battlefield tapped" in self.__text
+            self.__exilesSelf = "Exile " + self.__name in self.__text
+            self.__hasEnterTrigger = "When " + self.__name + " enters the battlefield" in self.__text
+            self.__entersWith = self.__name + " enters the battlefield with " in self.__text
+            # And during the untap step
+            self.__doesntUntap = self.__name + " doesn't untap during your untap step" in self.__text
+            template = (self.__cmc, self.__colorMask, self.__keywordsMask, self.__hasAnthem,
+                        self.__anthemPower, self.__anthemToughness, self.__anthemType,
+                        self.__anthemKeywords, self.__entersTapped, self.__exilesSelf,
+                        self.__hasEnterTrigger, self.__entersWith, self.__doesntUntap)
+            Card.TEMPLATES[key] = template
+        else:
+            (self.__cmc, self.__colorMask, self.__keywordsMask, self.__hasAnthem,
+             self.__anthemPower, self.__anthemToughness, self.__anthemType,
+             self.__anthemKeywords, self.__entersTapped, self.__exilesSelf,
+             self.__hasEnterTrigger, self.__entersWith, self.__doesntUntap) = template
+        self.__keywordsChanged()
         
         self.__facedown = False
-        self.__morph = False
-        if Card.MORPH in self.__keywords or Card.MEGAMORPH in self.__keywords:
-            self.__morph = True
-            self.__morphToken()
+        # The side of the card currently showing
+        self.__face = self
+        # The face down side only gets made when the card is morphed
+        self.__morph = self.__keywordMask & Card.MORPH_BITS != 0
+        
+    #--------------------------------------------------------------------------
+    # Checks this card's mana cost and works out its converted mana cost and
+    # colors. Raises a TypeError if the cost is formatted incorrectly.
+    #--------------------------------------------------------------------------
+    def __parseCost(self):
+        cost = self.__cost
+        if not self.costPattern.match(cost) and cost != "TRANSFORM":
+            raise TypeError("Mana cost for " + self.__name + " is formatted incorrectly.")
+        
+        # The generic part counts as its whole number, every other symbol
+        # besides X counts as one. Back faces have no cost.
+        if cost == "TRANSFORM":
+            self.__cmc = 0
+        else:
+            generic = _GENERIC_RE.match(cost)
+            self.__cmc = int(generic.group(1) or 0) + len(cost) - generic.end()
+        
+        # Colors are a bitmask of the colors in the mana cost, the name only
+        # gets built when someone asks for it.
+        self.__colorMask = 0
+        for symbol in _COLOR_SYMBOLS.intersection(cost):
+            self.__colorMask |= _COLOR_BITS[symbol]
         
     #--------------------------------------------------------------------------
     # Parses this card's rules text and determines what it needs to be able to
@@ -189,35 +338,39 @@ class Card:
     #    - Keywords
     #--------------------------------------------------------------------------
     def __parseText(self):
+        # Plenty of cards share the same text, like basic lands and tokens,
+        # so only parse each text once.
+        parsed = Card.PARSED_TEXT.get(self.__text)
+        if parsed is not None:
+            (self.__keywordsMask, self.__hasAnthem, self.__anthemPower,
+             self.__anthemToughness, self.__anthemType, self.__anthemKeywords) = parsed
+            return
+        
         # Check for any keywords this card has. Not keywords it gives to other
         # things, just keywords that apply to this particular card.
-        things = list()
-        lines = self.__text.split("\n")
-        validLine = True
-        for line in lines:
-            words = line.split(",")
-            for word in words:
-                if word.startswith(" "):
-                    word = word[1:]
-                word = word.rstrip().capitalize()
-                if word in Card.KEYWORDS:
-                    things.append(word)
-                else:
-                    validLine = False
-            if validLine:
-                for keyword in things:
-                    self.__keywords.append(keyword)
+        # Keywords are only read from the lines at the top of the text that
+        # are nothing but keywords. The first line with anything else ends it.
+        for line in self.__text.split("\n"):
+            lineMask = 0
+            for word in _COMMA_SPLIT.split(line.strip()):
+                bit = Card.KEYWORD_BITS.get(word.capitalize())
+                if bit is None:
+                    lineMask = None
+                    break
+                lineMask |= bit
+            if lineMask is None:
+                break
+            self.__keywordsMask |= lineMask
         
         # Check for morph cards, since that's a keyword that doesn't get found
         # in the above keyword search because it also has a mana cost with it.
-        morphPattern = re.compile("Morph|Megamorph X?[1-9]?[0-9]*[WUBRGC]*")
-        match = morphPattern.search(self.__text)
+        match = _MORPH_RE.search(self.__text)
         if match:
             words = match.group(0).split(" ")
             if words[0] == Card.MORPH:
-                self.__keywords.append(Card.MORPH)
+                self.__keywordsMask |= Card.KEYWORD_BITS[Card.MORPH]
             elif words[0] == Card.MEGAMORPH:
-                self.__keywords.append(Card.MEGAMORPH)
+                self.__keywordsMask |= Card.KEYWORD_BITS[Card.MEGAMORPH]
             else:
                 # Wat
                 pass
@@ -230,15 +383,12 @@ class Card:
         # (you control) get +P/+T <other things>." where anything in parentheses is
         # considered optional. The minimum pattern to match is therefore
         # "<Things> get +P/+T."
-        anthemPattern = re.compile("(Other )?[\w]*s?(,? (and )?[\w]*s?)* (you control)? get [+-][1-9]{1}[0-9]*/[+-][1-9]{1}[0-9]*.*\.")
-        # While the previous pattern hits anthems with power and toughness in them
-        # this one will hit things that only provide effects. This is the same regex but
-        # without the power and toughness parts. This is only tested if the other one fails.
-        keywordOnlyPattern = re.compile("(Other )?[\w]*s?(,? (and )?[\w]*s?)* (you control)? have .*\.")
-        match = anthemPattern.search(self.__text)
+        match = _ANTHEM_RE.search(self.__text)
         if not match:
-            # Check that we don't have an anthem without power and toughness
-            match = keywordOnlyPattern.search(self.__text)
+            # While the previous pattern hits anthems with power and toughness in them
+            # this one will hit things that only provide effects. This is the same regex but
+            # without the power and toughness parts. This is only tested if the other one fails.
+            match = _KW_ONLY_RE.search(self.__text)
         # If we got something, handle it
         if match:
             textString = match.group(0)
@@ -285,15 +435,12 @@ class Card:
                         if word.endswith("s"):
                             word = word[:-1]
                         # Just in case. Stranger things have happened.
-                        word = word.rstrip().capitalize()
+                        word = intern(word.rstrip().capitalize())
                         # We should be okay now so add the type to the list
                         self.__anthemType.append(word)
-                # Regex to match power and toughness of the anthem.
-                # Pretty much (read: actually) copied from above.
-                ptPattern = re.compile("[+-][1-9]{1}[0-9]*/[+-][1-9]{1}[0-9]*")
                 for word in words:
                     # Match power and toughness bonus
-                    ptMatch = ptPattern.match(word)
+                    ptMatch = _PT_RE.match(word)
                     # This will just fail on noncreature anthems or anthems with no bonus
                     if ptMatch:
                         ptString = ptMatch.group(0)
@@ -302,13 +449,15 @@ class Card:
                         self.__anthemToughness = int(split[1])
                         break
                 # Now check the entire string for any and all keywords it contains.
-                # Add them to the list.
-                for keyword in Card.KEYWORDS:
-                    #text = " ".join(words)
-                    # Don't want to search the whole rulestext string, just
-                    # search the anthem string. Searching all rulestext is bad.
-                    if keyword.lower() in textString:
-                        self.__anthemKeywords.append(keyword)
+                # Add them to the list, in the same order as Card.KEYWORDS.
+                # Don't want to search the whole rulestext string, just
+                # search the anthem string. Searching all rulestext is bad.
+                found = set(Card.keywordPattern.findall(textString))
+                self.__anthemKeywords = tuple(sorted((Card.KEYWORD_NAMES[k] for k in found), key=Card.KEYWORDS.index))
+        
+        self.__anthemType = tuple(self.__anthemType)
+        Card.PARSED_TEXT[self.__text] = (self.__keywordsMask, self.__hasAnthem, self.__anthemPower,
+                                         self.__anthemToughness, self.__anthemType, self.__anthemKeywords)
                 
     ###########################################################################
     #                                                                         #
@@ -320,17 +469,14 @@ class Card:
     # Return true if this card provides an anthem
     #--------------------------------------------------------------------------
     def anthem(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__hasAnthem
-        return self.__hasAnthem
+        return self.__face.__hasAnthem
 
     #--------------------------------------------------------------------------
     # Returns the keywords provided by this card's anthem if it has one
     #--------------------------------------------------------------------------
     def anthemKeywords(self):
         if self.anthem():
-            if self.__transformed or self.__facedown:
-                return self.__backSide.__anthemKeywords
+            return self.__face.__anthemKeywords
         return self.__anthemKeywords
     
     #--------------------------------------------------------------------------
@@ -338,9 +484,7 @@ class Card:
     #--------------------------------------------------------------------------
     def anthemPower(self):
         if self.anthem():
-            if self.__transformed or self.__facedown:
-                return self.__backSide.__anthemPower
-            return self.__anthemPower
+            return self.__face.__anthemPower
         return None
     
     #--------------------------------------------------------------------------
@@ -348,9 +492,7 @@ class Card:
     #--------------------------------------------------------------------------
     def anthemToughness(self):
         if self.anthem():
-            if self.__transformed or self.__facedown:
-                return self.__backSide.__anthemToughness
-            return self.__anthemToughness
+            return self.__face.__anthemToughness
         return None
     
     #--------------------------------------------------------------------------
@@ -358,33 +500,38 @@ class Card:
     #--------------------------------------------------------------------------
     def anthemType(self):
         if self.anthem():
-            if self.__transformed or self.__facedown:
-                return self.__backSide.__anthemType
-            return self.__anthemType
+            return self.__face.__anthemType
         return None
     
     #--------------------------------------------------------------------------
     # Return the card CMC
     #--------------------------------------------------------------------------
     def cmc(self):
-        cmc = 0
-        for char in self.__cost:
-            try:
-                cmc += int(char)
-            except TypeError:
-                if char != "X":
-                    cmc += 1
-                continue
-        return cmc
+        return self.__cmc
         
     #--------------------------------------------------------------------------
     # Return the card color
     #--------------------------------------------------------------------------
     def color(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__color
-        return self.__color
+        return _colorName(self.__face.__colorMask)
     
+    #--------------------------------------------------------------------------
+    # Returns every word in the card's type, subtype, and color in lowercase,
+    # for checking what anthems affect the card
+    #--------------------------------------------------------------------------
+    def categories(self):
+        face = self.__face
+        if face.__categories is None:
+            words = face.__type + " " + face.__subtype + " " + _colorName(face.__colorMask)
+            face.__categories = frozenset(words.lower().split())
+        return face.__categories
+
+    #--------------------------------------------------------------------------
+    # Returns true if this card stays tapped during the untap step
+    #--------------------------------------------------------------------------
+    def doesntUntap(self):
+        return self.__face.__doesntUntap
+
     #--------------------------------------------------------------------------
     # Returns true if this card is a commander
     #--------------------------------------------------------------------------
@@ -401,9 +548,7 @@ class Card:
     # Return the number of counters on the card
     #--------------------------------------------------------------------------
     def counters(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__counters + self.__countersMod + abs(self.__plusone)
-        return self.__counters + self.__countersMod + abs(self.__plusone)
+        return self.__face.__counters + self.__countersMod + abs(self.__plusone)
 
     #--------------------------------------------------------------------------
     # Returns true if this card if face down.
@@ -411,37 +556,57 @@ class Card:
     def facedown(self):
         return self.__facedown
     
+    #--------------------------------------------------------------------------
+    # Returns true if this card has morph or megamorph.
+    #--------------------------------------------------------------------------
+    def isMorph(self):
+        return self.__morph
+    
     #--------------------------------------------------------------------------
     # Return the number of counters on the card
     #--------------------------------------------------------------------------
     def keywords(self):
-        return self.__keywords + self.__anthemKeywordMod + self.__keywordMods
+        keywords = Card.KEYWORD_TUPLES.get(self.__keywordMask)
+        if keywords is None:
+            keywords = tuple(k for k in Card.KEYWORDS if self.__keywordMask & Card.KEYWORD_BITS[k])
+            Card.KEYWORD_TUPLES[self.__keywordMask] = keywords
+        return keywords
+        
+    #--------------------------------------------------------------------------
+    # Returns true if this card has the given keyword from any source
+    #--------------------------------------------------------------------------
+    def hasKeyword(self, keyword):
+        return self.__keywordMask & Card.KEYWORD_BITS.get(keyword, 0) != 0
         
     #--------------------------------------------------------------------------
     # Return the card name
     #--------------------------------------------------------------------------
     def name(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__name
-        return self.__name
+        return self.__face.__name
+
+    #--------------------------------------------------------------------------
+    # Return the card name in lowercase, for case insensitive searches
+    #--------------------------------------------------------------------------
+    def nameLower(self):
+        face = self.__face
+        if face.__nameLower is None:
+            face.__nameLower = face.__name.lower()
+        return face.__nameLower
 
     #--------------------------------------------------------------------------
     # Return the number of +1/+1 counters on the card
     # if it's a creature
     #--------------------------------------------------------------------------
     def plusone(self):
-        if Card.CREATURE in self.__type:
+        if self.__isCreature:
             return self.__plusone
     
     #--------------------------------------------------------------------------
     # Return power, if the card is a creature
     #--------------------------------------------------------------------------
     def power(self):
-        if Card.CREATURE in self.__type:
-            if self.__transformed or self.__facedown:
-                val = self.__backSide.__power + self.__powerMod + self.__anthemPowerBonus + self.__plusone
-            else:
-                val = self.__power + self.__powerMod + self.__anthemPowerBonus + self.__plusone
+        if self.__isCreature:
+            val = self.__face.__power + self.__powerBonus
             if val < 0:
                 return 0
             else:
@@ -451,23 +616,19 @@ class Card:
     # Return the rulestext of the card
     #--------------------------------------------------------------------------
     def rulestext(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__text
-        return self.__text
+        return self.__face.__text
     
     #--------------------------------------------------------------------------
     # Return the card subtype
     #--------------------------------------------------------------------------
     def subtype(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__subtype
-        return self.__subtype
+        return self.__face.__subtype
     
     #--------------------------------------------------------------------------
     # Tells whether this card has summoning sickness or not.
     #--------------------------------------------------------------------------
     def summonSick(self):
-        if Card.CREATURE in self.__type:
+        if self.__isCreature:
             return self.__summoningSickness
         else:
             return False
@@ -482,11 +643,8 @@ class Card:
     # Return toughness, if the card is a creature
     #--------------------------------------------------------------------------
     def toughness(self):
-        if Card.CREATURE in self.__type:
-            if self.__transformed or self.__facedown:
-                val = self.__backSide.__toughness + self.__toughnessMod + self.__anthemToughnessBonus + self.__plusone
-            else:
-                val = self.__toughness + self.__toughnessMod + self.__anthemToughnessBonus + self.__plusone
+        if self.__isCreature:
+            val = self.__face.__toughness + self.__toughnessBonus
             if val < 0:
                 return 0
             else:
@@ -496,9 +654,13 @@ class Card:
     # Return the card type
     #--------------------------------------------------------------------------
     def type(self):
-        if self.__transformed or self.__facedown:
-            return self.__backSide.__type
-        return self.__type
+        return self.__face.__type
+
+    #--------------------------------------------------------------------------
+    # Return the card types as a bitmask of Card.TYPE_BITS
+    #--------------------------------------------------------------------------
+    def typeMask(self):
+        return self.__face.__typeMask
     
     #--------------------------------------------------------------------------
     # Return the zone the card is in
@@ -514,66 +676,68 @@ class Card:
     ###########################################################################
     
     #--------------------------------------------------------------------------
-    # Remove a counter from this card
-    #--------------------------------------------------------------------------
-    def anthemPowerBonus(self, n):
-        self.__anthemPowerBonus += n
-
-    #--------------------------------------------------------------------------
-    # Remove a counter from this card
-    #--------------------------------------------------------------------------
-    def anthemToughnessBonus(self, n):
-        self.__anthemToughnessBonus += n
-
-    #--------------------------------------------------------------------------
-    # Adds a keyword provided by an anthem to this card
-    #--------------------------------------------------------------------------
-    def anthemKeywordMod(self, keywords):
-        self.__anthemKeywordMod += keywords
+    # Gives this card the power, toughness, and keywords from an anthem
+    #--------------------------------------------------------------------------
+    def applyAnthem(self, power, toughness, keywords):
+        self.__anthemPowerBonus += power
+        self.__powerBonus += power
+        self.__anthemToughnessBonus += toughness
+        self.__toughnessBonus += toughness
+        if keywords:
+            for keyword in keywords:
+                self.__anthemKeywordMask |= Card.KEYWORD_BITS[keyword]
+            self.__keywordsChanged()
+        self.__imageCache = None
         
     #--------------------------------------------------------------------------
     # Remove a counter from this card
     #--------------------------------------------------------------------------
     def modCounters(self, n):
-        if self.__zone == Card.BATTLEFIELD:
+        if self.__zone is Card.BATTLEFIELD:
             self.__countersMod += n
             # Can't have less than 0
             if self.__counters + self.__countersMod < 0:
                 self.__countersMod = 0 - self.__counters
+            self.__imageCache = None
     
     #------------------------------------------------------------------------------
     # Adds a keyword to a this card temporarily.
     #------------------------------------------------------------------------------
     def modKeywords(self, keyword):
-        if keyword in Card.KEYWORDS and keyword != Card.MORPH and keyword != Card.MEGAMORPH:
-            if keyword not in self.keywords():
-                self.__keywordMods.append(keyword)
+        if keyword in Card.KEYWORDS_SET and keyword != Card.MORPH and keyword != Card.MEGAMORPH:
+            if not self.hasKeyword(keyword):
+                self.__keywordModsMask |= Card.KEYWORD_BITS[keyword]
+                self.__keywordsChanged()
                 if keyword == Card.HASTE:
                     self.__summoningSickness = False
-                if keyword == Card.MORPH or keyword == Card.MEGAMORPH:
-                    self.__morph = True
-                    self.__morphToken()
         
     #--------------------------------------------------------------------------
     # Modify +1/+1 counters.
     #--------------------------------------------------------------------------
     def modPlusOne(self, n):
-        if Card.CREATURE in self.__type and self.__zone == Card.BATTLEFIELD:
+        if self.__isCreature and self.__zone is Card.BATTLEFIELD:
             self.__plusone += n
+            self.__powerBonus += n
+            self.__toughnessBonus += n
+            self.__imageCache = None
     
     #--------------------------------------------------------------------------
     # Modifies the power of a creature
     #--------------------------------------------------------------------------
     def modPower(self, n):
-        if Card.CREATURE in self.__type and self.__zone == Card.BATTLEFIELD:
+        if self.__isCreature and self.__zone is Card.BATTLEFIELD:
             self.__powerMod += n
+            self.__powerBonus += n
+            self.__imageCache = None
     
     #--------------------------------------------------------------------------
     # Modifies the toughness of a creature.
     #--------------------------------------------------------------------------
     def modToughness(self, n):
-        if Card.CREATURE in self.__type and self.__zone == Card.BATTLEFIELD:
+        if self.__isCreature and self.__zone is Card.BATTLEFIELD:
             self.__toughnessMod += n
+            self.__toughnessBonus += n
+            self.__imageCache = None
     
     #--------------------------------------------------------------------------
     # Resets anthem bonuses
@@ -581,7 +745,9 @@ class Card:
     def resetAnthem(self):
         self.__anthemPowerBonus = 0
         self.__anthemToughnessBonus = 0
-        del self.__anthemKeywordMod[:]
+        self.__sumBonuses()
+        self.__anthemKeywordMask = 0
+        self.__keywordsChanged()
 
     #--------------------------------------------------------------------------
     # Set a card's color
@@ -595,18 +761,52 @@ class Card:
     def setCommander(self):
         self.__commander = True
         self.__zone = Card.COMMAND
+        self.__refreshMoveKind()
     
     #--------------------------------------------------------------------------
     # Set a card's subtype
     #--------------------------------------------------------------------------
     def setSubtype(self, newSubtype):
-        self.__subtype = str(newSubtype)
+        self.__subtype = intern(str(newSubtype))
+        self.__categories = None
+        self.__imageCache = None
+        self.__bodyCache = None
         
     #--------------------------------------------------------------------------
     # Set a card's type
     #--------------------------------------------------------------------------
     def setType(self, newType):
-        self.__type = str(newType)
+        self.__type = intern(str(newType))
+        self.__categories = None
+        self.__refreshTypeFlags()
+        self.__imageCache = None
+        self.__bodyCache = None
+        
+    #--------------------------------------------------------------------------
+    # Works out which card types are in this card's type line. Has to be
+    # called whenever the type changes.
+    #--------------------------------------------------------------------------
+    def __refreshTypeFlags(self):
+        self.__typeMask = 0
+        for cardtype in Card.TYPES:
+            if cardtype in self.__type:
+                self.__typeMask |= Card.TYPE_BITS[cardtype]
+        # Creatures and planeswalkers get checked all the time
+        self.__isCreature = bool(self.__typeMask & Card.TYPE_BITS[Card.CREATURE])
+        self.__isPlaneswalker = bool(self.__typeMask & Card.TYPE_BITS[Card.PLANESWALKER])
+        self.__refreshMoveKind()
+        
+    #--------------------------------------------------------------------------
+    # Works out which rules this card follows when it changes zones. Has to be
+    # called whenever the type changes or the card becomes a commander.
+    #--------------------------------------------------------------------------
+    def __refreshMoveKind(self):
+        if self.__commander:
+            self.__moveKind = Card.MOVE_COMMANDER
+        elif self.__typeMask & Card.EMBLEM_BIT:
+            self.__moveKind = Card.MOVE_EMBLEM
+        else:
+            self.__moveKind = Card.MOVE_NORMAL
     
     ###########################################################################
     #                                                                         #
@@ -619,15 +819,12 @@ class Card:
     # and cause any necessary effects to happen (ETBs and such)
     #--------------------------------------------------------------------------
     def play(self):
-        if Card.INSTANT in self.__type or Card.SORCERY in self.__type:
-            if "Exile " + self.__name in self.__text:
+        if self.__typeMask & Card.SPELLS:
+            if self.__exilesSelf:
                 self.__zone = Card.EXILE
             else:                
                 self.__zone = Card.GRAVEYARD
-        elif Card.ARTIFACT in self.__type or Card.CREATURE in self.__type or Card.ENCHANTMENT in self.__type or Card.LAND in self.__type:
-            self.__zone = Card.BATTLEFIELD
-            self.enter()
-        elif Card.PLANESWALKER in self.__type:
+        elif self.__typeMask & Card.PERMANENTS:
             self.__zone = Card.BATTLEFIELD
             self.enter()
     
@@ -635,7 +832,7 @@ class Card:
     # Tells the card to move to the next turn, resolving upkeep triggers?
     #--------------------------------------------------------------------------
     def nextTurn(self):
-        if Card.CREATURE in self.__type:
+        if self.__isCreature:
             self.__summoningSickness = False
         
     #--------------------------------------------------------------------------
@@ -646,13 +843,32 @@ class Card:
     def endTurn(self):
         self.__powerMod = 0
         self.__toughnessMod = 0
-        del self.__keywordMods[:]
+        self.__sumBonuses()
+        self.__keywordModsMask = 0
+        self.__keywordsChanged()
+        
+    #--------------------------------------------------------------------------
+    # Adds up all the modifiers to power and toughness. Keeping the total
+    # around means power() and toughness() don't have to. Call this after
+    # resetting any of the modifiers.
+    #--------------------------------------------------------------------------
+    def __sumBonuses(self):
+        self.__powerBonus = self.__powerMod + self.__anthemPowerBonus + self.__plusone
+        self.__toughnessBonus = self.__toughnessMod + self.__anthemToughnessBonus + self.__plusone
+        self.__imageCache = None
+        
+    #--------------------------------------------------------------------------
+    # Combines the keyword masks into the mask of every keyword this card
+    # has. Needs to be called whenever one of the masks changes.
+    #--------------------------------------------------------------------------
+    def __keywordsChanged(self):
+        self.__keywordMask = self.__keywordsMask | self.__anthemKeywordMask | self.__keywordModsMask
         
     #--------------------------------------------------------------------------
     # Taps this card
     #--------------------------------------------------------------------------
     def tap(self):
-        if self.__zone == Card.BATTLEFIELD:
+        if self.__zone is Card.BATTLEFIELD:
             self.__tapped = True
         
     #--------------------------------------------------------------------------
@@ -665,14 +881,14 @@ class Card:
     # Discard this card, sending it to your graveyard
     #--------------------------------------------------------------------------
     def discard(self):
-        if self.__zone == Card.HAND:
+        if self.__zone is Card.HAND:
             self.__zone = Card.GRAVEYARD
             
     #--------------------------------------------------------------------------
     # Draw this card
     #--------------------------------------------------------------------------
     def draw(self):
-        if self.__zone == Card.LIBRARY:
+        if self.__zone is Card.LIBRARY:
             self.__zone = Card.HAND
         else:
             raise ZoneError(Card.Hand)
@@ -681,28 +897,32 @@ class Card:
     # This card entered the battlefield
     #--------------------------------------------------------------------------
     def enter(self):
-        if self.__name + " enters the battlefield tapped" in self.__text:
+        if self.__entersTapped:
             self.__tapped = True
-        if self.__type == Card.CREATURE:
-            if Card.HASTE in self.__keywords:
+        if self.__isCreature:
+            if self.__keywordsMask & Card.HASTE_BIT:
                 self.__summoningSickness = False
-        if "When " + self.__name + " enters the battlefield" in self.__text:
+        if self.__hasEnterTrigger:
             #resolveTrigger()
             pass
-        if self.__name + " enters the battlefield with "in self.__text:
+        if self.__entersWith:
             pass
     
     #--------------------------------------------------------------------------
     # This card left the battlefield
     #--------------------------------------------------------------------------
     def leave(self):
+        # Cards go back to their front face when they leave
         if self.__transformed or self.__facedown:
-            self.transform()
+            self.__transformed = False
+            self.__facedown = False
+            self.__turnFace()
         self.__powerMod = 0
         self.__toughnessMod = 0
+        self.__sumBonuses()
         self.__countersMod = 0
         self.__tapped = False
-        if Card.CREATURE in self.__type and Card.HASTE not in self.__keywords:
+        if self.__isCreature and not self.__keywordsMask & Card.HASTE_BIT:
             self.__summoningSickness = True
         
     #--------------------------------------------------------------------------
@@ -710,33 +930,33 @@ class Card:
     #--------------------------------------------------------------------------
     def morph(self):
         if self.__morph:
+            if self.__backSide is None:
+                self.__morphToken()
             self.__facedown = not self.__facedown
+            self.__turnFace()
     
     #--------------------------------------------------------------------------
     # Moves this card to the specified zone
     #--------------------------------------------------------------------------
     def move(self, zone):
         # Is this card leaving the battlefield?
-        leaves = False
-        if self.__zone == Card.BATTLEFIELD and zone != Card.BATTLEFIELD:
-            leaves = True
+        leaves = self.__zone is Card.BATTLEFIELD and zone != Card.BATTLEFIELD
         
+        if self.__moveKind == Card.MOVE_NORMAL:
+            if zone == Card.COMMAND:
+                raise ZoneError("Only the commander can be put in the command zone.")
+            self.__zone = zone
         # Commanders are special
-        if self.__commander:
+        elif self.__moveKind == Card.MOVE_COMMANDER:
             if zone != Card.HAND and zone != Card.BATTLEFIELD:
                 self.__zone = Card.COMMAND
             else:
                 self.__zone = zone
         # So are emblems
-        elif Card.EMBLEM in self.__type:
+        else:
             if zone != Card.BATTLEFIELD:
                 raise ZoneError("Can't interact with emblems on the battlefield.")
             self.__zone = Card.BATTLEFIELD
-        else:
-            if zone != Card.COMMAND:
-                self.__zone = zone
-            else:
-                raise ZoneError("Only the commander can be put in the command zone.")
         if leaves:
             self.leave()
     
@@ -746,6 +966,7 @@ class Card:
     def transform(self):
         if self.__flip:
             self.__transformed = not self.__transformed
+            self.__turnFace()
         
     ###########################################################################
     #                                                                         #
@@ -753,6 +974,17 @@ class Card:
     #                                                                         #
     ###########################################################################
 
+    #--------------------------------------------------------------------------
+    # Points the face at whichever side of the card is showing. Needs to be
+    # called whenever the card transforms or gets turned face up or down.
+    #--------------------------------------------------------------------------
+    def __turnFace(self):
+        if self.__transformed or self.__facedown:
+            self.__face = self.__backSide
+        else:
+            self.__face = self
+        self.__imageCache = None
+        
     #--------------------------------------------------------------------------
     # Returns true if this card is a spilt card
     #--------------------------------------------------------------------------
@@ -801,9 +1033,13 @@ class Card:
         self.__backSide = card
         self.__linked = True 
         if self.__split:
-            self.__name += "/" + self.__backSide.__name
-
-            self.__backSide.__name == self.__name
+            # Both halves go by the full name, but still print their own
+            self.__name = intern(self.__name + "/" + self.__backSide.__name)
+            self.__backSide.__name = self.__name
+            self.__nameLower = None
+            self.__backSide.__nameLower = None
+            self.__imageCache = None
+            self.__backSide.__imageCache = None
             
     #--------------------------------------------------------------------------
     # Returns the back side of a transform card
@@ -826,171 +1062,113 @@ class Card:
     ###########################################################################
     
     #--------------------------------------------------------------------------
-    # The textwrap function is bad and cutting off my lines early
+    # Wraps rules text to the width of the card. Paragraphs in the text are
+    # wrapped separately so the existing line breaks are kept.
     #--------------------------------------------------------------------------
     def wrapText(self, text):
-        # Split specifically on a space, not any whitespace
-        tokens = text.split(" ")
-        # Final string that will get returned
-        string = ""
-        linelength = 0
-        for word in tokens:
-            # No newline and word doesn't go over
-            if not "\n" in word and linelength + len(word) + 1 <= self.width:
-                if linelength > 0:
-                    string += " "
-                    linelength += 1
-                string += word
-                linelength += len(word)
-            # No newline but word does go over
-            elif not "\n" in word and linelength + len(word) + 1 > self.width:
-                string += "\n"
-                string += word
-                linelength = len(word)
-            # Newline in word, word does not go over
-            elif "\n" in word and linelength + len(word.rstrip()) + 1 <= self.width:
-                if linelength > 0:
-                    string += " "
-                string += word
-                string += "\n"
-                linelength = 0
-            # Newline in word, word goes over
-            else:
-                string += "\n"
-                string += word
-                string += "\n"
-                linelength = 0
-        return string.rstrip()
+        paragraphs = []
+        for paragraph in text.split("\n"):
+            paragraph = paragraph.strip()
+            # Most paragraphs are short enough to fit on one line already
+            if len(paragraph) > self.width:
+                paragraph = Card.wrapper.fill(paragraph)
+            paragraphs.append(paragraph)
+        # Leave a blank line between paragraphs
+        return "\n\n".join(paragraphs).rstrip()
     
     #--------------------------------------------------------------------------
     # Returns a string which when printed will form an image of the card.
     # View at your own risk.
     #--------------------------------------------------------------------------
     def image(self):
-        cardImage = ""
+        if self.__imageCache is not None:
+            return self.__imageCache
+        if self.__bodyCache is None:
+            self.__bodyCache = self.__body()
+        isCreature = self.__isCreature
+        isPlaneswalker = self.__isPlaneswalker
+        if not (isCreature or isPlaneswalker):
+            self.__imageCache = self.__bodyCache
+            return self.__imageCache
+        # Pieces of the bottom of the card, joined onto the body at the end
+        parts = [self.__bodyCache]
+        width = self.width
+        # Handle creatues. They get a larger box, an extra number, and a /
+        if isCreature:
+            power = str(self.power())
+            toughness = str(self.toughness())
+            # Extra 3 for whitespace and for the /
+            box = 3 + len(power) + len(toughness)
+            # Top border of the P/T box
+            parts.append("|%s|\n" % ("-" * box).rjust(width))
+            # Line with power/toughness on it
+            parts.append("|%s" % ("| %s/%s " % (power, toughness)).rjust(width))
+        # Handle planeswalkers, their box size is smaller and they just have one number
+        if isPlaneswalker:
+            counters = str(self.__counters + self.__countersMod)
+            # Extra 2 for whitespace
+            box = 2 + len(counters)
+            # Top border of the box for counters
+            parts.append("|%s|\n" % ("-" * box).rjust(width))
+            # Line with counters on it
+            parts.append("|%s" % ("| %s " % counters).rjust(width))
+        parts.append("|\n")
+        # Write the bottom border
+        parts.append(Card.BORDER)
+        self.__imageCache = "".join(parts)
+        return self.__imageCache
+    
+    #--------------------------------------------------------------------------
+    # Draws the parts of the card that don't change during a game. For
+    # creatures and planeswalkers this stops right above the box with power
+    # and toughness or loyalty, which image() fills in. Everything else gets
+    # drawn all the way to the bottom border.
+    #--------------------------------------------------------------------------
+    def __body(self):
+        # Pieces of the body, joined together at the end
+        parts = []
+        append = parts.append
+        width = self.width
+        height = self.height
+        half = height // 2
+        cost = self.__cost
         # Write the top border
-        cardImage += " "
-        for i in range(0, self.width):
-            cardImage += "-"
-        cardImage += " \n"
+        append(Card.BORDER)
         # Write the first line with name and cost
-        cardImage += "|"
-        namelen = len(self.__name)
-        if self.__split:
-            shortName = self.__name.split("//")[0]
-            cardImage += shortName
-            namelen = len(shortName)
-        else:
-            cardImage += self.__name
-        for i in range (0, (self.width - namelen - len(self.__cost))):
-            cardImage += " "
-        cardImage += self.__cost
-        cardImage += "|\n"
-        cardImage += "|"
-        for i in range(0, self.width):
-            cardImage += "-"
-        cardImage += "|\n"
+        name = self.__printedName
+        append("|%s%s|\n" % (name.ljust(width - len(cost)), cost))
+        append(Card.DIVIDER)
         # Blank space for ART
-        for i in range(2, self.height/2 - 2):
-            cardImage += "|"
-            for j in range(0, self.width):
-                cardImage += " "
-            cardImage += "|\n"
+        append(Card.BLANK_LINE * (half - 4))
         # Top border of the center section
-        cardImage += "|"
-        for i in range (0, self.width):
-            cardImage += "-"
-        cardImage += "|\n"
+        append(Card.DIVIDER)
         # Center section
-        cardImage += "|"
         typeStr = self.__type
         if self.__subtype:
             typeStr += " - " + self.__subtype
-        cardImage += typeStr
-        for i in range(0, self.width - len(typeStr)):
-            cardImage += " "
-        cardImage += "|\n"
+        append("|%s|\n" % typeStr.ljust(width))
         # Bottom border of center section
-        cardImage += "|"
-        for i in range (0, self.width):
-            cardImage += "-"
-        cardImage += "|\n"
+        append(Card.DIVIDER)
         # Prepare to print rulestext....this will be difficult
-        # Wrap text to self.width chars but keep existing newlines
+        # Wrap text to width chars but keep existing newlines
         wrap = self.wrapText(self.__text)
         lineCount = 0
         lines = wrap.split("\n")
         # Each line in the wrapped text needs to be inserted into the card
         # with the right amount of padding for the border to line up.
         for line in lines:
-            cardImage += "|"
-            cardImage += line
-            for i in range(len(line), self.width):
-                cardImage += " "
-            cardImage += "|\n"
+            append("|%s|\n" % line.ljust(width))
             lineCount += 1
-        if Card.CREATURE in self.__type or Card.PLANESWALKER in self.__type:
+        if self.__isCreature or self.__isPlaneswalker:
             # Print the rest of the card up to the power/toughness
             # 2 is to leave 2 lines for power/toughness
-            for i in range(self.height/2 + 1 + lineCount, self.height - 2):
-                cardImage += "|"
-                for j in range(0, self.width):
-                    cardImage += " "
-                cardImage += "|\n"
-            # Handle creatues. They get a larger box, an extra number, and a /
-            if Card.CREATURE in self.__type:
-                # Print the power/toughness lines
-                cardImage += "|"
-                # Extra 3 for whitespace and for the /
-                box = 3 + len(str(self.power())) + len(str(self.toughness()))
-                for i in range(0, self.width-box):
-                    cardImage += " "
-                # Write the top border of the P/T box
-                for i in range(0, box):
-                    cardImage += "-"
-                cardImage += "|\n"
-                # Line with power/toughness on it
-                cardImage += "|"
-                for i in range(0, self.width-(box+1)):
-                    cardImage += " "
-                cardImage += "| "
-                cardImage += str(self.power())
-                cardImage += "/"
-                cardImage += str(self.toughness())
-                cardImage += " "
-            # Handle planeswalkers, their box size is smaller and they just have one number
-            if Card.PLANESWALKER in self.__type:
-                # Print the lines with the box for counters
-                cardImage += "|"
-                # Extra 2 for whitespace
-                box = 2 + len(str(self.__counters + self.__countersMod))
-                for i in range(0, self.width-box):
-                    cardImage += " "
-                # Write the top border of the box
-                for i in range(0, box):
-                    cardImage += "-"
-                cardImage += "|\n"
-                # Line with counters on it
-                cardImage += "|"
-                for i in range(0, self.width-(box+1)):
-                    cardImage += " "
-                cardImage += "| "
-                cardImage += str(self.__counters + self.__countersMod)
-                cardImage += " "
-            cardImage += "|\n"            
+            append(Card.BLANK_LINE * (height - 2 - (half + 1 + lineCount)))
         else:
             # If not a creature or a planeswalker the last 2 lines are normal
-            for i in range(self.height/2 + 1 + lineCount, self.height):
-                cardImage += "|"
-                for j in range(0, self.width):
-                    cardImage += " "
-                cardImage += "|\n"
-        # Write the bottom border
-        cardImage += " "
-        for i in range(0, self.width):
-            cardImage += "-"
-        cardImage += " \n"
-        return cardImage
+            append(Card.BLANK_LINE * (height - (half + 1 + lineCount)))
+            # Write the bottom border
+            append(Card.BORDER)
+        return "".join(parts)
     
     #--------------------------------------------------------------------------
     # Overwrites the print function to print a card.
@@ -1003,72 +1181,64 @@ class Card:
         cardFront = self.image()
         if self.__flip or self.__split:
             cardBack = self.__backSide.image()
-            frontTokens = cardFront.split("\n")
-            backTokens = cardBack.split("\n")
-            numLines = len(frontTokens)
-            card = ""
-            for i in range(0, numLines):
-                card += frontTokens[i]
-                card += " "
-                card += backTokens[i]
-                card += "\n"
-            return card
+            lines = zip(cardFront.split("\n"), cardBack.split("\n"))
+            return "\n".join(front + " " + back for front, back in lines) + "\n"
         else:
             return cardFront
 
     #--------------------------------------------------------------------------
-    # Overrides the equality operator so that we can consider two cards to be
-    # the same if they have the same name. If the card is a token, check other
-    # fields as well, like power, toughness, color, and rulestext. That way we
-    # don't accidentally compare a 1/1 cat with vigilance and a 2/2 vanilla cat
-    # as the same just because they're both called "Cat".
+    # Returns true if the other card is the same card as this one. Cards are
+    # the same if they have the same name. If either card is a token, check
+    # power, toughness, and rulestext as well. That way we don't accidentally
+    # compare a 1/1 cat with vigilance and a 2/2 vanilla cat as the same just
+    # because they're both called "Cat".
     #
-    # So apparently this was actually breaking stuff because reasons
-    #--------------------------------------------------------------------------
-    """def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            if Card.TOKEN in other.__type or Card.TOKEN in self.__type:
-                # Tokens have a few special cases.
-                if self.__name == other.__name:
-                    # If the token is a creature we check power, toughness
-                    # and text
-                    if Card.CREATURE in self.__type \
-                            and Card.CREATURE in other.__type \
-                            and self.__power == other.__power \
-                            and self.__toughness == other.__toughness \
-                            and self.__text == other.__text:
-                        return True
-                    # If not just check text
-                    return self.__text == other.__text
-                else:
-                    # If they don't have the same name they're immediately
-                    # considered different
-                    return False
-            else:
-                # Nontokens we can just compare name. No two different cards
-                # have the same name.
-                return self.__name == other.__name
-        else:
-            # In this case the second object isn't even a card...
-            return False"""
+    # This isn't __eq__ because the game keeps lists of cards and needs to
+    # remove the exact copy of a card it was given, not the first one with
+    # the same name.
+    #--------------------------------------------------------------------------
+    def matches(self, other):
+        if not isinstance(other, Card):
+            return False
+        # Names are interned so this is usually just an identity check
+        if self.__name != other.__name:
+            return False
+        if (self.__typeMask | other.__typeMask) & Card.TOKEN_BIT:
+            return self.power() == other.power() and self.toughness() == other.toughness() \
+                    and self.__text == other.__text
+        return True
     
     #--------------------------------------------------------------------------
     # Returns a token that's a copy of this card.
     #--------------------------------------------------------------------------
-    def copy(self):        
-        token = copy.deepcopy(self)
-        if not Card.TOKEN in token.__type:
-            type = ""
-            typenames = self.__type.split(" ")
-            for cardtype in typenames:
-                if cardtype in Card.SUPERTYPES:
-                    type += cardtype + " "
-            if not Card.TOKEN in self.__type:
-                type += Card.TOKEN + " "
-            for cardtype in typenames:
-                if not cardtype in Card.SUPERTYPES:
-                    type += cardtype + " "
-            token.__type = type.rstrip()
+    def copy(self):
+        # Most of a card never changes once it's made, so the token can
+        # share it. Only the things that happen to a card in play start over.
+        token = object.__new__(Card)
+        for attr in Card.SLOT_NAMES:
+            setattr(token, attr, getattr(self, attr))
+        token.__tapped = False
+        token.__powerMod = 0
+        token.__toughnessMod = 0
+        token.__countersMod = 0
+        token.__plusone = 0
+        token.__anthemPowerBonus = 0
+        token.__anthemToughnessBonus = 0
+        token.__anthemKeywordMask = 0
+        token.__keywordModsMask = 0
+        token.__sumBonuses()
+        token.__keywordsChanged()
+        token.__turnFace()
+        if not token.__typeMask & Card.TOKEN_BIT:
+            # Token goes after the supertypes and before everything else
+            supertypes = []
+            types = []
+            for cardtype in self.__type.split(" "):
+                if cardtype in Card.SUPERTYPES_SET:
+                    supertypes.append(cardtype)
+                else:
+                    types.append(cardtype)
+            token.setType(" ".join(supertypes + [Card.TOKEN] + types).rstrip())
         return token
         
     ###########################################################################
@@ -52,15 +52,20 @@
 #
 # RUNNING THE PLAYTESTER
 #
-# The playtester is run at the command line by typing
+# The playtester needs Python 3 and is run at the command line by typing
 #
-# python ./play.py <decklist.deck>
+# python3 ./play.py <decklist.deck>
 # or, for debugging,
-# python ./play.py debug <decklist.deck>
+# python3 ./play.py debug <decklist.deck>
 #
 # Debug mode prevents the playtester from clearing the console every time
 # the boardstate gets updated, allowing any other output to be viewed.
 #
+# The playtester only uses the standard library, so it also runs under PyPy,
+# which speeds up long sessions once its JIT has warmed up:
+#
+# pypy3 ./play.py <decklist.deck>
+#
 # USING THE PLAYTESTER
 #
 # Most commands are of the form <command> <args> <cardname>. Additionally, a
@@ -81,8 +86,30 @@ from card import CardNotFoundError
 from card import CommandError
 import random
 import sys
-import subprocess
 import re
+from collections import deque
+from functools import lru_cache
+# Gives input() line editing and history where it's available
+try:
+    import readline
+except ImportError:
+    pass
+
+# Regexes used to build tokens and emblems out of rules text. Compiled once
+# here instead of for every card that gets loaded.
+
+# Everything we want to know about a token, so the text only gets scanned
+# once. Groups are:
+#   pt     power and toughness
+#   color  color, like "blue" or "colorless"
+#   type   types, like "legendary 1/1 Human Wizard creature token"
+#   text   keywords, like "with flying onto the battlefield"
+_TOKEN_RE = re.compile("(?P<pt>X?[0-9]+/X?[0-9]+)"
+                       "|(?P<color>white|blue|black|red|green|colorless(?: and (?:white|blue|black|red|green))?)"
+                       "|(?P<type>(?:legendary)? (?:[A-Z]{1}[a-z]* )+(?:enchantment|artifact|creature){1,2} token)"
+                       "|(?P<text>with [a-z]* onto the battlefield)")
+# Quoted abilities on an emblem
+_EMBLEM_TEXT_RE = re.compile('".+?"( and \".*\")*')
 
 # Debug mode
 debug = False
@@ -117,25 +144,43 @@ combat = False
 # Is the top of my library revealed?
 revealed = False
 
+# Has the library been shuffled since anything last looked at its order? The
+# actual shuffle waits until then, so several shuffles in a row only happen
+# once.
+unshuffled = False
+
+# Is the board being left alone until a run of commands is done?
+holdBoardstate = False
+
 # Number of times a commander has been played from the command zone this game
 commandPlayCount = 0
 
 # Lists with the cards in them.
 # Most will just get appended to.
-# grave will get things insterted
-# at index 0 so that it prints
-# most recent at the top.
+# grave and exiled will get things
+# insterted at the front so that
+# they print most recent at the top,
+# and the library gets cards taken
+# off the top, so those are deques.
 deck = list()
-library = list()
+library = deque()
 field = list()
 hand = list()
-grave = list()
-exiled = list()
+grave = deque()
+exiled = deque()
 
 # Tokens and emblems
 tokens = list()
 emblems = list()
 
+# Cards that currently have bonuses from an anthem, so only those need to be
+# reset before anthems are applied again
+anthemed = set()
+
+# Cards that have been changed until end of turn, so only those need to be
+# reset when the turn ends
+modified = set()
+
 # Uh
 top = None
 bottom = None
@@ -143,11 +188,32 @@ bottom = None
 # List containing all of the zones from above
 zones = (library, field, hand, grave, exiled)
 
+# The list for each zone cards can be moved out of by name. The command zone
+# doesn't have one.
+ZONE_LISTS = {Card.HAND: hand,
+              Card.BATTLEFIELD: field,
+              Card.EXILE: exiled,
+              Card.GRAVEYARD: grave,
+              Card.LIBRARY: library}
+
+# How a card gets put into each zone it can be moved to
+ZONE_PUTS = {Card.LIBRARY: library.append,
+             Card.TOP: library.appendleft,
+             Card.BOTTOM: library.append,
+             Card.BATTLEFIELD: field.append,
+             Card.HAND: hand.append,
+             Card.EXILE: exiled.append,
+             Card.GRAVEYARD: grave.appendleft}
+
 # Not commander by default. This will point
 # to the commander card object itself if we
 # are playing commander.
 commander = False
 
+# Terminal escape codes to clear the screen and move the cursor to the top
+# left. Much cheaper than starting a shell to run clear on every redraw.
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+
 ###############################################################################
 #                                                                             #
 #                        FUNCTIONS TO MANIPULATE STUFF                        #
@@ -155,11 +221,28 @@ commander = False
 ###############################################################################
     
 #------------------------------------------------------------------------------
-# Prints the current board state, with a fancy header
+# Returns the cards on the battlefield with the given type
+#------------------------------------------------------------------------------
+def cardsOfType(type):
+    typeBit = Card.TYPE_BITS[type]
+    return [thing for thing in field if thing.typeMask() & typeBit]
+
+#------------------------------------------------------------------------------
+# Takes a group of cards off the battlefield all at once
+#------------------------------------------------------------------------------
+def removeFromField(cards):
+    removed = set(cards)
+    field[:] = [thing for thing in field if thing not in removed]
+
+#------------------------------------------------------------------------------
+# Prints the current board state, with a fancy header. Does nothing while do
+# is running, since the board gets printed once when it finishes.
 #------------------------------------------------------------------------------
 def boardstate():
+    if holdBoardstate:
+        return
     if not debug:
-        subprocess.call("clear", shell=True)
+        sys.stdout.write(CLEAR_SCREEN)
     # Here we build the header of the playtester, which displays
     # information on turn number, as well as life total, poison
     # counters, and possibly commander damage for 2 players.
@@ -172,80 +255,65 @@ def boardstate():
     printZone(library, Card.LIBRARY)
     printZone(hand, Card.HAND)
     printZone(field, Card.BATTLEFIELD)
+    # Let them know if someone won
+    if p1Win:
+        print("Player 1 win")
+    if p2Win:
+        print("Player 2 win")
     
-#------------------------------------------------------------------------------
-# Formats a line of text to print in the header bar
-#------------------------------------------------------------------------------
-def formatHeaderLine(width, string1, string2):
-    midpoint = width / 2
-    frontWhitespaceLen = (midpoint - len(string1)) / 2
-    line = "|"
-    for i in range(0, frontWhitespaceLen):
-        line += " "
-    line += string1
-    midWhitespaceLen = (midpoint - len(string2)) / 2 + 1
-    for i in range(len(line) - 1, midpoint):
-        line += " "
-    for i in range(0, midWhitespaceLen):
-        line += " "
-    line += string2
-    for i in range(len(line) - 1, width):
-        line += " "
-    return line + "|"
+# Inside width of the header box, and the templates for its lines. The turn
+# counter is centered across the whole box, everything else is two columns,
+# one for each player.
+HEADER_WIDTH = 70
+HEADER_BORDER = " " + "-" * HEADER_WIDTH
+HEADER_TURN = "|{0:^70}|"
+HEADER_COLUMNS = "|{0:^35} {1:^34}|"
 
 #------------------------------------------------------------------------------
 # Prints the header for the boardstate
 #------------------------------------------------------------------------------
 def header():
-    # This is the inside width of the box
-    width = 70
-    # Top border
-    line = ""
-    line += " "
-    for i in range(0, width):
-        line += "-"
-    print line
-    
-    # Next line with turn counter
-    lineText = "Turn " + str(turn)
-    frontWhitespaceLen = (width - len(lineText)) / 2
-    line = "|"
-    for i in range(0, frontWhitespaceLen):
-        line += " "
-    line += lineText
-    for i in range(len(line) - 1, width):
-        line += " "
-    print line + "|"
-    
-    # Second line, this has names on it
-    line = formatHeaderLine(width, player1, player2)
-    print line
-    
-    # Third line has life totals on it
-    line = formatHeaderLine(width, "L: " + str(p1Life), "L: " + str(p2Life))
-    print line
-    
-    # Fourth line is poison counters
-    line = formatHeaderLine(width, "P: " + str(p1Poison), "P: " + str(p2Poison))
-    print line
+    lines = [HEADER_BORDER,
+             # Turn counter
+             HEADER_TURN.format("Turn " + str(turn)),
+             # Names
+             HEADER_COLUMNS.format(player1, player2),
+             # Life totals
+             HEADER_COLUMNS.format("L: " + str(p1Life), "L: " + str(p2Life)),
+             # Poison counters
+             HEADER_COLUMNS.format("P: " + str(p1Poison), "P: " + str(p2Poison))]
     
     # Optional last line for commander damage
     if commander:
-        line = formatHeaderLine(width, "C: " + str(p1Commander), "C: " + str(p2Commander))
-        print line
+        lines.append(HEADER_COLUMNS.format("C: " + str(p1Commander), "C: " + str(p2Commander)))
         # If the commander is in the command zone
         if commander.zone() == Card.COMMAND:
             string = commander.name()
             if commandPlayCount > 0:
                 string += " (" + str(commandPlayCount) + ")"
-            line = formatHeaderLine(width, string, "")
-            print line
+            lines.append(HEADER_COLUMNS.format(string, ""))
     # Bottom border
-    line = ""
-    line += " "
-    for i in range(0, width):
-        line += "-"
-    print line
+    lines.append(HEADER_BORDER)
+    sys.stdout.write("\n".join(lines) + "\n")
+
+# Lowercase card types that can be asked for by name. Emblems are left out
+# since you can't interact with those once they're on the field.
+_TYPE_NAMES = dict((typeName.lower(), typeName) for typeName in Card.TYPES
+                   if typeName != Card.EMBLEM)
+# Every string that picks out exactly one zone, mapped to that zone. Any part
+# of a zone name counts, so "grave" and "yard" are both the graveyard, while
+# "t" is in too many zone names to mean anything.
+ZONE_ALIASES = dict()
+for _zone in Card.ZONES:
+    _zoneLower = _zone.lower()
+    for _start in range(len(_zoneLower)):
+        for _end in range(_start + 1, len(_zoneLower) + 1):
+            _alias = _zoneLower[_start:_end]
+            if ZONE_ALIASES.get(_alias, _zone) is _zone:
+                ZONE_ALIASES[_alias] = _zone
+            else:
+                ZONE_ALIASES[_alias] = None
+del _zone, _zoneLower, _start, _end, _alias
 
 #------------------------------------------------------------------------------
 # Gets a card from the necessary part of the args array. Names in double
@@ -261,27 +329,23 @@ def header():
 # name as a card in your hand, getCard will default to the top card of your
 # library instead of the card in your hand. Most of the time this is a good
 # thing. If not, the Move command can be used instead.
-#------------------------------------------------------------------------------
-def getCard(args, zone=deck, cmd=None):
-    # Skip up to a certain number of cards. Skip should be the last item in args.
-    try:
-        skip = int(args[-1]) - 1
-        if skip < 0:
-            skip = 0
-        cardname = " ".join(args[:-1])
-    except ValueError:
-        skip = 0
-        # This is the card name they passed in
-        cardname = " ".join(args)
+# If tapped is given, matching cards that aren't tapped or untapped to match
+# are skipped over, so tapping finds an untapped card and untapping finds a
+# tapped one.
+# If count is given, a list of count cards is returned instead, the same ones
+# that count calls with the skip going up by one each time would get.
+#------------------------------------------------------------------------------
+def getCard(args, zone=deck, cmd=None, tapped=None, count=None):
+    cardname, skip = parseCardName(tuple(args))
     # Generic card?
     if cardname == "card" and zone:
-        return zone[0]
+        return [zone[0]] * count if count is not None else zone[0]
+    # Only lowercase the name once, every card gets compared against it
+    needle = cardname.lower()
     # Are we getting a card type?
-    for typeName in Card.TYPES:
-        if cardname.lower() == typeName.lower() and typeName != Card.EMBLEM:
-            # We can return any typename that's not Emblem, since you can't
-            # interact with those once they're on the field.
-            return typeName
+    if needle in _TYPE_NAMES:
+        type = _TYPE_NAMES[needle]
+        return [type] * count if count is not None else type
 
     # If we don't need a specific zone, just get the first instance
     # of the card in the deck. Mostly useful for viewing.
@@ -290,55 +354,54 @@ def getCard(args, zone=deck, cmd=None):
     
     # Special case for when the top card of the library is playable
     if revealed and zone == hand and cmd == "play":
+        settleLibrary()
         if cardname.startswith("\"") and cardname.endswith("\"") and len(cardname) > 2:
-            if cardname[1:-1] == library[0].name():
+            if needle[1:-1] == library[0].nameLower():
                 return library[0]
-        elif cardname in library[0].name().lower():
+        elif needle in library[0].nameLower():
             return library[0]
     
-    # The card we'll return
-    ret = None
-    # This was going to get used to check if a given string
-    # matched a unique card name but I never got around to making it work
-    valid = True
     if cardname.startswith("\"") and cardname.endswith("\"") and len(cardname) > 2:
         # Got a double quoted string so they want an exact match
         # Cut off the quotes
         cardname = cardname[1:-1]
-        for card in zone:
-            # Look at each card and see if the names match. Ignore case.
-            if cardname.lower() == card.name().lower():
-                if skip == 0:
-                    # If we've skipped the right number
-                    # of cards then we're done
-                    ret = card
-                    break
-                else:
-                    # Still need to skip some more
-                    skip -= 1
-                    # Save this card anyways, since it matched, and
-                    # there might not be enough matches in the deck
-                    ret = card
+        needle = needle[1:-1]
+        # Look at each card and see if the names match. Ignore case.
+        matches = [card for card in zone if needle == card.nameLower()]
     else:
         # No quotes, just see if the given string is in the name
-        for card in zone:
-            # Same stuff as above
-            if cardname.lower() in card.name().lower():
-                # Look at me trying to make sure I only return
-                # a unique card and failing
-                #if ret and card.name() != ret.name():
-                #    valid = False
-                if skip == 0:
-                    ret = card
-                    break
-                else:
-                    skip -= 1
-                    ret = card
-    # If we found a card (ideally a unique card) return it
-    if ret and valid:
-        return ret
+        matches = [card for card in zone if needle in card.nameLower()]
+    # Skip the right number of matches. If there aren't enough of them,
+    # settle for the last one.
+    if matches:
+        if count is not None:
+            last = len(matches) - 1
+            return [matches[min(i, last)] for i in range(skip, skip + count)]
+        if tapped is not None:
+            for card in matches[skip:]:
+                if card.tapped() is tapped:
+                    return card
+        return matches[min(skip, len(matches) - 1)]
     raise CardNotFoundError(cardname)
 
+#------------------------------------------------------------------------------
+# Splits the args array into the card name and the number of matching cards to
+# skip, which is one less than the number at the end of args if there is one.
+# args must be a tuple. The same names get looked up over and over, especially
+# by do, so the answers are cached.
+#------------------------------------------------------------------------------
+@lru_cache(maxsize=64)
+def parseCardName(args):
+    # Skip up to a certain number of cards. Skip should be the last item in args.
+    try:
+        skip = int(args[-1]) - 1
+        if skip < 0:
+            skip = 0
+        return " ".join(args[:-1]), skip
+    except ValueError:
+        # This is the card name they passed in
+        return " ".join(args), 0
+
 #------------------------------------------------------------------------------
 # Gets the actual name of a zone from a string. Tests to see if the given
 # string is in a zone name and returns the zone name if it is. A zone will only
@@ -346,19 +409,7 @@ def getCard(args, zone=deck, cmd=None):
 # the input string, the function will return None.
 #------------------------------------------------------------------------------
 def getZoneNameFromString(string):
-    string = string.lower()
-    ret = None
-    valid = True
-    
-    for zone in Card.ZONES:
-        if string.lower() in zone.lower():
-            if ret:
-                valid = False
-            ret = zone
-    # Only return if we didn't match more than one zone
-    if valid:
-        return ret
-    return None
+    return ZONE_ALIASES.get(string.lower())
 
 #------------------------------------------------------------------------------
 # Loads the decklist from a text file specified
@@ -367,35 +418,34 @@ def getZoneNameFromString(string):
 def load(filename):
     global commander
     global DECK_SIZE
-    list = open(filename)
+    # Read the whole file at once
+    with open(filename) as deckFile:
+        lines = deckFile.read().splitlines()
+    # Cards in the deck so far by name, so we don't have to search the
+    # whole deck to find duplicates or the other half of a card
+    byName = {}
     # Each line will contain a single card's information
-    for line in list:
+    for line in lines:
+        # Skip blank lines
+        if not line.strip():
+            continue
         info = line.split(";")
-        # Try/catch an index error in case some fields are missing
+        # Unpacking fails if some fields are missing
         try:
-            if info[0] == "Commander":
-                commander = True
-                DECK_SIZE = 100
-                cardCount = 1
-            else:
-                try:
-                    cardCount = int(info[0])
-                    # Can't have less than 1 of a card
-                    if cardCount < 1:
-                        raise ValueError
-                except ValueError:
-                    # Error if invalid card count
-                    print "Invalid card count for " + info[1]
-                    sys.exit(1)
-            name = info[1]
-            cost = info[2]
-            type = info[3]
-            subtype = info[4]
-            power = info[5]
-            toughness = info[6]
-            text = info[7]
-        except IndexError:
-            print "Index out of bounds on " + name
+            name, cost, type, subtype, power, toughness, text = info[1:8]
+        except ValueError:
+            print(f"Missing fields on {line}")
+            sys.exit(1)
+        if info[0] == "Commander":
+            commander = True
+            DECK_SIZE = 100
+            cardCount = 1
+        # Can't have less than 1 of a card
+        elif info[0].isdigit() and int(info[0]) > 0:
+            cardCount = int(info[0])
+        else:
+            # Error if invalid card count
+            print(f"Invalid card count for {name}")
             sys.exit(1)
         # Make cardCount copies of the new card
         for i in range(0, cardCount):
@@ -406,21 +456,18 @@ def load(filename):
             if len(info) == 10:
                 # Create the new card, giving it the name of the other
                 # card object it will have to link to
-                newCard = Card(name, cost, type, subtype, power, toughness, text, info[9].rstrip())
+                otherHalf = info[9].rstrip()
+                newCard = Card(name, cost, type, subtype, power, toughness, text, otherHalf)
                 # It should be either a TRANSFORM card or a SPLIT card.
                 # Both halves of each are treated the same for now.
                 if info[8] == "TRANSFORM":
                     # Mark this as a transform card
                     newCard.setTransform()
-                    frontFace = info[9].rstrip()
-                    # Loop over each existing card in the deck.
-                    # Testing to see if those cards are the front face
-                    # of the new transform card.
-                    for card in deck:
-                        # If a card is the front face, it will have the same name.
+                    # Look at the cards in the deck with the front face's name.
+                    for card in byName.get(otherHalf, ()):
                         # If it's not already linked to a card, then we can link these
                         # two together.
-                        if card.name() == frontFace and not card.linked():
+                        if not card.linked():
                             card.linkBackSide(newCard)
                             # If this new card got linked to another one, it's a secondary
                             # card (the back face of a transform) and shouldn't appear
@@ -430,10 +477,13 @@ def load(filename):
                 elif info[8] == "SPLIT":
                     # Pretty much the same thing here except replace transform with split
                     newCard.setSplit()
-                    firstHalf = info[9].rstrip()
-                    for card in deck:
-                        if card.name() == firstHalf and not card.linked():
+                    for card in byName.get(otherHalf, ()):
+                        if not card.linked():
                             card.linkBackSide(newCard)
+                            # Linking renames the first half, so move it
+                            # to its new name
+                            byName[otherHalf].remove(card)
+                            byName.setdefault(card.name(), []).append(card)
                             append = False
                             break
             # This case is the default case
@@ -442,21 +492,22 @@ def load(filename):
             # If the card is a commander, then mark it as a commander. It still goes in the
             # deck but it won't go in the library normally this way.
             else:
-                print "Invalid card syntax for " + info[1]
+                print(f"Invalid card syntax for {name}")
                 sys.exit(1)
             if info[0] == "Commander":
                 newCard.setCommander()
                 commander = newCard
             # Commander decks can't have duplicates of cards that aren't
-            # basic lands so check for that here.
-            if commander and not Card.BASIC in newCard.type():
-                for card in deck:
-                    if newCard.name() == card.name():
-                        print "Duplicate of " + newCard.name()
-                        sys.exit(1)
+            # basic lands so check for that here. A back half that just got
+            # linked shares its front half's name, so it doesn't count.
+            if append and commander and not Card.BASIC in newCard.type():
+                if byName.get(newCard.name()):
+                    print(f"Duplicate of {newCard.name()}")
+                    sys.exit(1)
             # Finally, add the card to the deck
             if append:
                 deck.append(newCard)
+                byName.setdefault(newCard.name(), []).append(newCard)
                 if not newCard.commander():
                     library.append(newCard)
             if "token" in newCard.rulestext():
@@ -465,7 +516,7 @@ def load(filename):
                 buildEmblem(newCard)
     # If the deck is not equal to the deck size (either 60 or 100) exit
     if len(deck) != DECK_SIZE:
-        print "Deck list must be " + str(DECK_SIZE) + " cards, you had " + str(len(deck))
+        print(f"Deck list must be {DECK_SIZE} cards, you had {len(deck)}")
         sys.exit(1)
 
 #------------------------------------------------------------------------------
@@ -479,50 +530,44 @@ def buildTokens(text):
     subtype = ""
     rulestext = ""
 
+    # Find the first match for each part of the token
+    found = {}
+    for match in _TOKEN_RE.finditer(text):
+        if match.lastgroup not in found:
+            found[match.lastgroup] = match.group(0)
+
     # Get power/toughness
-    ptPattern = re.compile("X?[0-9]+/X?[0-9]+")
-    match = ptPattern.search(text)
-    if match:
-        ptString = match.group(0)
+    if "pt" in found:
+        ptString = found["pt"]
         power = int(ptString.split("/")[0])
         toughness = int(ptString.split("/")[1])
     # Get color
-    colorPattern = re.compile("white|blue|black|red|green|colorless (and white|blue|black|red|green)?")
-    match = colorPattern.search(text)
-    if match:
-        colorString = match.group(0).split(" and ")
+    if "color" in found:
+        colorString = found["color"].split(" and ")
         color = colorString[0]
         if len(colorString) == 2:
             color2 = colorString[1]
             color = color + " " + color2
     
     # Get types
-    typePattern = re.compile("(legendary)? ([A-Z]{1}[a-z]* )+(enchantment|artifact|creature){1,2} token")
-    match = typePattern.search(text)
-    if match:
-        typeString = match.group(0).split(" ")
+    if "type" in found:
+        typeString = found["type"].split(" ")
         typeString.remove("token")
         typeString.remove("")
         if typeString[0] == "legendary":
             type += "Legendary "
             typeString = typeString[1:]
         type += "Token"
-        if Card.ENCHANTMENT.lower() in typeString:
-            type += " " + Card.ENCHANTMENT
-            typeString.remove(Card.ENCHANTMENT.lower())
-        if Card.ARTIFACT.lower() in typeString:
-            type += " " + Card.ARTIFACT
-            typeString.remove(Card.ARTIFACT.lower())
-        if Card.CREATURE.lower() in typeString:
-            type += " " + Card.CREATURE
-            typeString.remove(Card.CREATURE.lower())
+        for tokenType in (Card.ENCHANTMENT, Card.ARTIFACT, Card.CREATURE):
+            tokenTypeLower = tokenType.lower()
+            if tokenTypeLower in typeString:
+                type += " " + tokenType
+                typeString.remove(tokenTypeLower)
         subtype = " ".join(typeString)
     
     # Get rulestext
-    textPattern = re.compile("with [a-z]* onto the battlefield")
-    match = textPattern.search(text)
-    if match:
-        textString = match.group(0).split(" ")
+    if "text" in found:
+        textString = found["text"].split(" ")
         textString.remove("with")
         textString.remove("onto")
         textString.remove("the")
@@ -536,10 +581,9 @@ def buildTokens(text):
         # Prevents making 3 copies of an Elspeth token.
         valid = True
         for token in tokens:
-            if token.name() == newToken.name() and token.color() == newToken.color() and \
-                    token.power() == newToken.power() and token.toughness() == newToken.toughness() and \
-                    token.rulestext == newToken.rulestext():
+            if token.matches(newToken):
                 valid = False
+                break
         if valid:
             tokens.append(newToken)
 
@@ -553,8 +597,7 @@ def buildEmblem(walker):
     if subtype.endswith(","):
         subtype = subtype[:-1]
     text = ""
-    textPattern = re.compile('".+?"( and \".*\")*')
-    match = textPattern.search(walker.rulestext())
+    match = _EMBLEM_TEXT_RE.search(walker.rulestext())
     if match:
         textString = match.group(0).split("\" and \"")
         lines = list()
@@ -564,7 +607,7 @@ def buildEmblem(walker):
             if line.endswith("\""):
                 line = line[:-1]
             lines.append(line)
-        emblemText = ".\ ".join(lines)
+        emblemText = ".\\ ".join(lines)
         emblem = Card(name, "", type, subtype, None, None, emblemText, None)
         emblems.append(emblem)
 
@@ -572,138 +615,127 @@ def buildEmblem(walker):
 # Prints a copy of the decklist
 #------------------------------------------------------------------------------
 def printDecklist():
-    for card in deck:
-        sys.stdout.write(card.name())
-        for i in range(len(card.name()), 40):
-            sys.stdout.write(" ")
-        print card.type()
+    printCardList(deck)
     sys.exit()
 
 #------------------------------------------------------------------------------
 # Prints all cards in your library
 #------------------------------------------------------------------------------
 def printLibrary():
-    for card in library:
-        sys.stdout.write(card.name())
-        for i in range(len(card.name()), 40):
-            sys.stdout.write(" ")
-        print card.type()
+    settleLibrary()
+    printCardList(library)
     sys.exit()
 
 #------------------------------------------------------------------------------
-# Prints cards in a specified zone. Only call with zones and lists that match
-# or it will print weird things.
+# Prints the name and type of each card in a list, all in one write
 #------------------------------------------------------------------------------
-def printZone(zoneList, zoneName):
+def printCardList(cards):
+    sys.stdout.write("".join(card.name().ljust(40) + card.type() + "\n" for card in cards))
+
+#------------------------------------------------------------------------------
+# Lists the library. Don't print cards in the library, that would be cheating.
+# Only the top card gets listed, and only if it's been revealed.
+#------------------------------------------------------------------------------
+def listLibrary(zoneList):
     global revealed
-    cardlist = ""
-    # Don't print cards in the library. That would be cheating.
-    if zoneName == Card.LIBRARY:
-        for card in field:
-            if "Play with the top card of your library revealed." in card.rulestext() and not cardlist:
-                if library:
-                    revealed = True
-                    cardlist += library[0].name() + "\n"
-                    break
-                else:
-                    revealed = False
-                    cardlist += "Empty"
+    settleLibrary()
+    parts = []
+    for card in field:
+        if "Play with the top card of your library revealed." in card.rulestext() and not parts:
+            if library:
+                revealed = True
+                parts.append(library[0].name() + "\n")
+                break
             else:
                 revealed = False
-    else:
-        # If we're supposed to print the battlefield we have
-        # a lot of special cases to deal with
-        if zoneName == Card.BATTLEFIELD:
-            # We want to sort the field by type, here's a list
-            # to store types we've printed already so we don't
-            # print artifact creatures and other two-type cards
-            # multiple times.
-            used = list()
-            # Loop over the types, the list in Card.TYPES is in
-            # the order we want things to print in.
-            for type in Card.TYPES:
-                # Do cards of this type exist on the field yet?
-                exist = False
-                # Now look through each card on the battlefield
-                for card in zoneList:
-                    # As far as we know we haven't printed this
-                    # card yet. Could be wrong though.
-                    printed = False
-                    if type in card.type():
-                        # Here we know we're looking at a card
-                        # that has the type we want to print
-                        for usedType in used:
-                            if usedType in card.type():
-                                # If one of its types has been
-                                # printed already, then skip it
-                                printed = True
-                        if not printed:
-                            # Indicate tapped cards with a T
-                            if card.tapped():
-                                cardlist += "T"
-                            else:
-                                cardlist += " "
-                            if card.summonSick():
-                                cardlist += "S"
-                            else:
-                                cardlist += " "
-                            cardlist += "  "
-                            # Here's the card name finally
-                            cardlist += card.name()
-                            # Creatures are special, they have
-                            # power and toughness on them
-                            if type == Card.CREATURE:
-                                # Some whitespace for nicer formatting.
-                                # Or something like that.
-                                for i in range(len(card.name()), Card.width - 5):
-                                    cardlist += " "
-                                # Dunno why I don't just copy the dynamic box
-                                # code from the card image...
-                                if card.power() < 10:
-                                    cardlist += " "
-                                cardlist += str(card.power()) + "/" + str(card.toughness())
-                                # Creatures can also have counters
-                                if card.counters() > 0:
-                                    cardlist += "  " + str(card.counters()) + "c"
-                            else:
-                                # And so can everything else. Those ones just don't
-                                # have power and toughness, so they get whitespace
-                                # instead.
-                                if card.counters() > 0:
-                                    for i in range(len(card.name()), Card.width + 1):
-                                        cardlist += " "
-                                    cardlist += str(card.counters()) + "c"
-                            cardlist += "\n"
-                            # We just printed a card so cards of this
-                            # type must exist
-                            exist = True
-                # If cards of this type exist, we want a newline
-                # to separate them from cards of a different type
-                if exist:
-                    cardlist += "\n"
-                # Regardless of whether this type appeared on the
-                # field or not, we've now used it. Don't print
-                # cards with this type again.
-                used.append(type)
-        elif zoneName == Card.HAND:
-            # For cards in hand, indicate their type name
-            for card in hand:
-                i = 0
-                for type in Card.TYPES:
-                    if type in card.type():
-                        cardlist += type[0]
-                        i += 1
-                for j in range(i, 4):
-                    cardlist += " "
-                cardlist += card.name() + "\n"
-
+                parts.append("Empty")
         else:
-            # Cards not on the battlefield are really easy.
-            for card in zoneList:
-                cardlist += card.name()
-                cardlist += "\n"
-    print zoneName + " (" + str(len(zoneList)) + "):"
-    print cardlist
+            revealed = False
+    return parts
+
+# Markers for tapped and summoning sick cards on the battlefield, indexed by
+# tapped | summonSick << 1
+_TAP_SICK = ("  ", "T ", " S", "TS")
+
+#------------------------------------------------------------------------------
+# Lists the battlefield. We have a lot of special cases to deal with here.
+#------------------------------------------------------------------------------
+def listBattlefield(zoneList):
+    parts = []
+    # We want to sort the field by type. Each card goes in
+    # the bucket for the first of its types, so artifact
+    # creatures and other two-type cards only print once.
+    buckets = dict((type, []) for type in Card.TYPES)
+    for card in zoneList:
+        typeMask = card.typeMask()
+        for type in Card.TYPES:
+            if typeMask & Card.TYPE_BITS[type]:
+                buckets[type].append(card)
+                break
+    # Loop over the types, the list in Card.TYPES is in
+    # the order we want things to print in.
+    for type in Card.TYPES:
+        # Skip types that don't exist on the field
+        if not buckets[type]:
+            continue
+        for card in buckets[type]:
+            # Indicate tapped cards with a T and summoning sick ones with an S
+            parts.append(_TAP_SICK[card.tapped() | card.summonSick() << 1])
+            parts.append("  ")
+            # Creatures are special, they have
+            # power and toughness on them
+            if type == Card.CREATURE:
+                # Here's the card name finally, padded for nicer formatting
+                parts.append(card.name().ljust(Card.width - 5))
+                # Line the slashes up for powers under 10
+                parts.append(str(card.power()).rjust(2) + "/" + str(card.toughness()))
+                # Creatures can also have counters
+                if card.counters() > 0:
+                    parts.append("  " + str(card.counters()) + "c")
+            # And so can everything else. Those ones just don't
+            # have power and toughness, so they get whitespace
+            # instead.
+            elif card.counters() > 0:
+                parts.append(card.name().ljust(Card.width + 1) + str(card.counters()) + "c")
+            else:
+                parts.append(card.name())
+            parts.append("\n")
+        # Cards of this type exist, so we want a newline
+        # to separate them from cards of a different type
+        parts.append("\n")
+    return parts
+
+#------------------------------------------------------------------------------
+# Lists the hand, along with the first letter of each card's types
+#------------------------------------------------------------------------------
+def listHand(zoneList):
+    parts = []
+    # For cards in hand, indicate their type name
+    for card in zoneList:
+        typeMask = card.typeMask()
+        letters = "".join(type[0] for type in Card.TYPES if typeMask & Card.TYPE_BITS[type])
+        parts.append(letters.ljust(4) + card.name() + "\n")
+    return parts
+
+#------------------------------------------------------------------------------
+# Lists any other zone. Cards not on the battlefield are really easy.
+#------------------------------------------------------------------------------
+def listCards(zoneList):
+    return [card.name() + "\n" for card in zoneList]
+
+# Zones that need special listings. Everything else uses listCards.
+ZONE_LISTINGS = {Card.LIBRARY: listLibrary,
+                 Card.BATTLEFIELD: listBattlefield,
+                 Card.HAND: listHand}
+
+#------------------------------------------------------------------------------
+# Prints cards in a specified zone. Only call with zones and lists that match
+# or it will print weird things.
+#------------------------------------------------------------------------------
+def printZone(zoneList, zoneName):
+    # Each listing gives back the pieces of its lines, joined together once here
+    parts = ZONE_LISTINGS.get(zoneName, listCards)(zoneList)
+    sys.stdout.write(zoneName + " (" + str(len(zoneList)) + "):\n" + "".join(parts) + "\n")
 
 #------------------------------------------------------------------------------
 # Reset the program for a new game
@@ -750,10 +782,10 @@ def reset():
 #------------------------------------------------------------------------------
 def reshuffle():
     global library
-    del library[:]
+    library.clear()
     del hand[:]
-    del grave[:]
-    del exiled[:]
+    grave.clear()
+    exiled.clear()
     del field[:]
     for card in deck:
         if not card.commander():
@@ -768,19 +800,18 @@ def reshuffle():
 ###############################################################################
 
 #------------------------------------------------------------------------------
-# Checks if the game is over or not. Listed first because it doesn't modify
-# the game state like all the other functions.
+# Ends the game with a win for the given player. Called as soon as something
+# happens that wins the game.
 #------------------------------------------------------------------------------
-def checkVictory():
+def win(player):
     global p1Win
     global p2Win
     global GAME_OVER
-    if p1Win:
-        GAME_OVER = True
-        print "Player 1 win"
-    if p2Win:
-        GAME_OVER = True
-        print "Player 2 win"
+    if player == "p1":
+        p1Win = True
+    else:
+        p2Win = True
+    GAME_OVER = True
 
 #------------------------------------------------------------------------------
 # Handles state-based actions, like creatures dying if they have zero toughness
@@ -788,12 +819,15 @@ def checkVictory():
 #------------------------------------------------------------------------------
 def stateBased():
     removing = list()
+    creatureBit = Card.TYPE_BITS[Card.CREATURE]
+    planeswalkerBit = Card.TYPE_BITS[Card.PLANESWALKER]
     for card in field:
+        typeMask = card.typeMask()
         # Kill creatures with 0 toughness
-        if Card.CREATURE in card.type() and card.toughness() == 0:
+        if typeMask & creatureBit and card.toughness() == 0:
             removing.append(card)
         # Kill planeswalkers with 0 counters
-        if Card.PLANESWALKER in card.type() and card.counters() == 0:
+        elif typeMask & planeswalkerBit and card.counters() == 0:
             removing.append(card)
     for card in removing:
         kill(card)
@@ -806,29 +840,25 @@ def anthem(card):
     anthemPower = card.anthemPower()
     anthemToughness = card.anthemToughness()
     anthemKeywords = card.anthemKeywords()
+    # Only lowercase the anthem's types once
+    anthemTypesLower = frozenset(type.lower() for type in anthemType)
+    other = "other" in anthemTypesLower
     for thing in field:
-        if "Other" in anthemType and thing == card:
+        if other and thing is card:
             continue
-        for type in anthemType:
-            typeInThingType = type.lower() in thing.type().lower()
-            typeInThingSubtype = type.lower() in thing.subtype().lower()
-            typeInThingColor = type.lower() in thing.color().lower()
-            #thingIsCreature = Card.CREATURE in thing.type()
-            
-            thingIsAffected = typeInThingType or typeInThingSubtype or typeInThingColor
-            #andWithLast = orFirstThree and thingIsCreature
-            if thingIsAffected:
-                thing.anthemPowerBonus(anthemPower)
-                thing.anthemToughnessBonus(anthemToughness)
-                thing.anthemKeywordMod(anthemKeywords)
-                break
+        # Affected if any of the anthem's types is one of the thing's
+        # types, subtypes, or colors
+        if not anthemTypesLower.isdisjoint(thing.categories()):
+            thing.applyAnthem(anthemPower, anthemToughness, anthemKeywords)
+            anthemed.add(thing)
 
 #------------------------------------------------------------------------------
 # Applies anthems to all applicable creatures.
 #------------------------------------------------------------------------------
 def applyAnthems():
-    for card in field:
+    for card in anthemed:
         card.resetAnthem()
+    anthemed.clear()
     for card in field:
         if card.anthem():
             anthem(card)
@@ -847,11 +877,11 @@ def attack(attackers):
     # Loop through attacking creatures
     for creature in attackers:
         damage = creature.power()
-        if Card.DOUBLESTRIKE in creature.keywords():
-            damage += creature.power()
+        if creature.hasKeyword(Card.DOUBLESTRIKE):
+            damage *= 2
         # Handle non-infect damage first, it's much more common.
-        if not Card.INFECT in creature.keywords():
-            if creature == commander:
+        if not creature.hasKeyword(Card.INFECT):
+            if creature is commander:
                 totalCommander += damage
             else:
                 total += damage
@@ -860,7 +890,7 @@ def attack(attackers):
             # Commanders with infect don't deal commander damage
             # so there's no extra check.
             poison += damage
-        if Card.VIGILANCE not in creature.keywords():
+        if not creature.hasKeyword(Card.VIGILANCE):
             creature.tap()
     # Gotten all the damage totals by here, time to apply them.
     modStat("p2", "life", -1*total)
@@ -871,15 +901,14 @@ def attack(attackers):
 # Returns a card from the battlefield to your hand.
 #------------------------------------------------------------------------------
 def bounce(card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
         remove = list()
-        for thing in field:
-            if type in thing.type():
-                thing.move(Card.HAND)
-                remove.append(thing)
+        for thing in cardsOfType(type):
+            thing.move(Card.HAND)
+            remove.append(thing)
+        removeFromField(remove)
         for thing in remove:
-            field.remove(thing)
             if not Card.TOKEN in thing.type():
                 hand.append(thing)
     else:
@@ -892,18 +921,16 @@ def bounce(card):
 # Creates a token that's a copy of a card on the field.
 #------------------------------------------------------------------------------
 def copy(card):
-    token = card.copy()
-    field.append(token)
+    enterBattlefield(card.copy())
 
 #------------------------------------------------------------------------------
 # Adds n counters to a card. n can be negative
 #------------------------------------------------------------------------------
 def counters(n, card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
-        for thing in field:
-            if type in thing.type():
-                thing.modCounters(n)
+        for thing in cardsOfType(type):
+            thing.modCounters(n)
     else:
         card.modCounters(n)
 
@@ -913,50 +940,61 @@ def counters(n, card):
 def discard(card):
     card.discard()
     hand.remove(card)
-    grave.insert(0, card)
+    grave.appendleft(card)
 
 #------------------------------------------------------------------------------
 # Draw a number of cards
 # number = number of cards to draw
 #------------------------------------------------------------------------------
 def draw(number):
-    try:
-        for i in range(0, number):
-            card = library.pop(0)
-            card.draw()
-            hand.append(card)
-    except IndexError:
-        p2Win = True
+    settleLibrary()
+    # Only draw what's there. Drawing from an empty library loses the game,
+    # but the cards that were there still get drawn first.
+    available = len(library)
+    # Take all the cards off the top at once
+    drawn = [library.popleft() for i in range(min(number, available))]
+    for card in drawn:
+        card.draw()
+    hand.extend(drawn)
+    if number > available:
+        win("p2")
 
 #------------------------------------------------------------------------------
 # Ends your turn. This resets until end of turn modifiers, without advancing
 # the turn counter, untapping things, or drawing a card.
 #------------------------------------------------------------------------------       
 def endTurn():
-    for card in field:
+    for card in modified:
         card.endTurn()
+    modified.clear()
+
+#------------------------------------------------------------------------------
+# Puts a new token or emblem onto the battlefield
+#------------------------------------------------------------------------------
+def enterBattlefield(card):
+    card.move(Card.BATTLEFIELD)
+    field.append(card)
 
 #------------------------------------------------------------------------------
 # Exiles a card in play
 # card = card to exile
 #------------------------------------------------------------------------------
 def exile(card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
         remove = list()
-        for thing in field:
-            if type in thing.type():
-                thing.move(Card.EXILE)
-                remove.append(thing)
+        for thing in cardsOfType(type):
+            thing.move(Card.EXILE)
+            remove.append(thing)
+        removeFromField(remove)
         for thing in remove:
-            field.remove(thing)
-            if not Card.TOKEN in thing.type() and thing != commander:
-                exiled.insert(0, thing)
+            if not Card.TOKEN in thing.type() and thing is not commander:
+                exiled.appendleft(thing)
     else:
         card.move(Card.EXILE)
         field.remove(card)
-        if not Card.TOKEN in card.type() and card != commander:
-            exiled.insert(0, card)
+        if not Card.TOKEN in card.type() and card is not commander:
+            exiled.appendleft(card)
 
 #------------------------------------------------------------------------------
 # Fetches a card from your library to your hand.
@@ -969,24 +1007,23 @@ def fetch(args):
 # card = card to destroy
 #------------------------------------------------------------------------------
 def kill(card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
         remove = list()
-        for thing in field:
-            if type in thing.type():
-                if not Card.INDESTRUCTIBLE in thing.keywords():
-                    thing.move(Card.GRAVEYARD)
-                    remove.append(thing)
+        for thing in cardsOfType(type):
+            if not thing.hasKeyword(Card.INDESTRUCTIBLE):
+                thing.move(Card.GRAVEYARD)
+                remove.append(thing)
+        removeFromField(remove)
         for thing in remove:
-            field.remove(thing)
-            if not Card.TOKEN in thing.type() and thing != commander:
-                grave.insert(0, thing)
+            if not Card.TOKEN in thing.type() and thing is not commander:
+                grave.appendleft(thing)
     else:
-        if not Card.INDESTRUCTIBLE in card.keywords():
+        if not card.hasKeyword(Card.INDESTRUCTIBLE):
             card.move(Card.GRAVEYARD)
             field.remove(card)
-            if not Card.TOKEN in card.type() and card != commander:
-                grave.insert(0, card)
+            if not Card.TOKEN in card.type() and card is not commander:
+                grave.appendleft(card)
 
 #------------------------------------------------------------------------------
 # Causes a player to lose an amount of life.
@@ -998,36 +1035,34 @@ def modStat(player, stat, number):
     global p2Poison
     global p1Commander
     global p2Commander
-    global p1Win
-    global p2Win
     if player == "p1":
         if stat == "life":
             p1Life += number
             if p1Life <= 0:
-                p2Win = True
+                win("p2")
         if stat == "poison":
             p1Poison += number
             if p1Poison >= 10:
-                p2Win = True
+                win("p2")
         if stat == "commander":
             p1Commander += number
             p1Life -= number
             if p1Commander > 20:
-                p2Win = True
+                win("p2")
     elif player == "p2":
         if stat == "life":
             p2Life += number
             if p2Life <= 0:
-                p1Win = True
+                win("p1")
         if stat == "poison":
             p2Poison += number
             if p2Poison >= 10:
-                p1Win = True
+                win("p1")
         if stat == "commander":
             p2Commander += number
             p2Life -= number
             if p2Commander > 20:
-                p1Win = True
+                win("p1")
     else:
         raise CommandError
 
@@ -1035,16 +1070,17 @@ def modStat(player, stat, number):
 # Mills the top n cards of your library.
 #------------------------------------------------------------------------------
 def mill(n):
-    for i in range(0, n):
-        card = library[0]
-        card.move(Card.GRVEYARD)
-        library.remove(card)
-        grave.insert(0, card)
+    settleLibrary()
+    for i in range(0, min(n, len(library))):
+        card = library.popleft()
+        card.move(Card.GRAVEYARD)
+        grave.appendleft(card)
 
 #------------------------------------------------------------------------------
 # Moves a card between zones
 #------------------------------------------------------------------------------
 def move(fromZone, toZone, cardArgs=None):
+    settleLibrary()
     # Get the right value for the from zone
     fromZone = getZoneNameFromString(fromZone)
     # Get the right value for the to zone
@@ -1053,73 +1089,51 @@ def move(fromZone, toZone, cardArgs=None):
     if not fromZone or not toZone:
         raise ZoneError("Zone does not exist, or zone name is not specific enough.")
     
-    # Do we need to shuffle the library after moving the card?
-    shuffleLibrary = False
     # So far we don't have a card. Maybe that will change in a minute.
     card = None
     # Change the zone to the corresponding list
-    if fromZone == Card.HAND:
-        fromZone = hand
-    if fromZone == Card.BATTLEFIELD:
-        fromZone = field
-    if fromZone == Card.EXILE:
-        fromZone = exiled
-    if fromZone ==  Card.GRAVEYARD:
-        fromZone = grave
-    if fromZone == Card.LIBRARY:
-        fromZone = library
-        shuffleLibrary = True
-    if fromZone == Card.COMMAND:
-        fromZone = None
-    if (fromZone == Card.TOP or fromZone == Card.BOTTOM) and cardArgs != None:
-        raise ZoneError("Can't move a specific card from top or bottom.")
+    fromList = ZONE_LISTS.get(fromZone)
     # If they want the top card or the bottom card
     if fromZone == Card.TOP or fromZone == Card.BOTTOM:
+        if cardArgs != None:
+            raise ZoneError("Can't move a specific card from top or bottom.")
         # We're taking a card from the library, just a specific index
         # instead of a specific card like the others
         if fromZone == Card.TOP:
             card = library[0]
-        if fromZone == Card.BOTTOM:
+        else:
             card = library[-1]
-        fromZone = library
+        fromList = library
     
     # Get the card if they gave one. We shouldn't be here if we need a card
     # and they didn't give one.
     if cardArgs:
-        card = getCard(cardArgs, fromZone)
+        card = getCard(cardArgs, fromList)
         
     # Prepare to move the card if it exists
     if card:
-        if fromZone:
+        if toZone == Card.COMMAND and not card.commander():
+            # Can't put something that's not the commander in the command zone
+            raise ZoneError(card.name() + " can't be put in the command zone.")
+        if fromList is not None:
             # If the place the card is coming from exists as a list
             # in this program (so not the command zone)
-            fromZone.remove(card)
-            if shuffleLibrary:
+            fromList.remove(card)
+            if fromZone == Card.LIBRARY:
                 # Simple enough, right?
                 shuffle()
         if not Card.TOKEN in card.type():
             # If it's not a token it can go places besides the battlefield.
             # Otherwise it just sort of goes away.
+            if toZone in ZONE_PUTS:
+                # Don't shuffle away a card that was just put on top or bottom
+                if toZone == Card.TOP or toZone == Card.BOTTOM:
+                    settleLibrary()
+                ZONE_PUTS[toZone](card)
             if toZone == Card.LIBRARY:
-                library.append(card)
                 shuffle()
-            if toZone == Card.TOP:
-                toZone = Card.LIBRARY
-                library.insert(0, card)
-            if toZone == Card.BOTTOM:
+            elif toZone == Card.TOP or toZone == Card.BOTTOM:
                 toZone = Card.LIBRARY
-                library.append(card)
-            if toZone == Card.BATTLEFIELD:
-                field.append(card)
-            if toZone == Card.HAND:
-                hand.append(card)
-            if toZone == Card.EXILE:
-                exiled.append(card)
-            if toZone == Card.GRAVEYARD:
-                grave.insert(0, card)
-        if toZone == Card.COMMAND and not card.commander():
-            # Can't put something that's not the commander in the command zone
-            raise ZoneError(card.name() + " can't be put in the command zone.")
         card.move(toZone)
     else:
         raise CardNotFoundError("Card")
@@ -1158,33 +1172,34 @@ def nextTurn():
 def play(card):
     global commandPlayCount
     # Dump all cards of a cretain type at once
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         # Somehow
         pass
     
     else:
+        settleLibrary()
         # Until then only play cards that are actual cards
         # Cards can be played if they are in hand, if they are a commander,
         # if they are tokens, or if the top card of your library is revealed
         # and playable.
-        if card in hand or card.commander() or Card.TOKEN in card.type() or revealed and library and card == library[0]:
+        if card in hand or card.commander() or Card.TOKEN in card.type() or revealed and library and card is library[0]:
             # If we're playing the commander from the command zone increment count
-            if card == commander:
+            if card is commander:
                 if card.zone() == Card.COMMAND:
                     commandPlayCount += 1
             # Otherwise remove the card from hand 
             if card in hand:
                 hand.remove(card)
             # Or maybe the library
-            if library and card == library[0]:
-                library.pop(0)
+            if library and card is library[0]:
+                library.popleft()
             # Play it
             card.play()
             # Figure out what zone it ended up in and put it there.
             if card.zone() == Card.GRAVEYARD:
-                grave.insert(0, card)
+                grave.appendleft(card)
             elif card.zone() == Card.EXILE:
-                exiled.insert(0, card)
+                exiled.appendleft(card)
             elif card.zone() == Card.BATTLEFIELD:
                 field.append(card)
             elif card.zone() == Card.LIBRARY:
@@ -1194,7 +1209,7 @@ def play(card):
                 library.append(card)
                 card.move(Card.LIBRARY)
             elif card.zone() == Card.TOP:
-                library.insert(0, card)
+                library.appendleft(card)
                 card.move(Card.LIBRARY)
         else:
             raise ZoneError(card.name() + " needs to be in your hand to play it.")
@@ -1203,11 +1218,10 @@ def play(card):
 # Adds a +1/+1 counter to the card
 #------------------------------------------------------------------------------
 def plusone(n, card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
-        for thing in field:
-            if type in thing.type():
-                thing.modPlusOne(n)
+        for thing in cardsOfType(type):
+            thing.modPlusOne(n)
     else:
         card.modPlusOne(n)
 
@@ -1215,55 +1229,71 @@ def plusone(n, card):
 # Adds n power to a card until end of turn. n can be negative
 #------------------------------------------------------------------------------
 def power(n, card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
-        for thing in field:
-            if type in thing.type():
-                thing.modPower(n)
+        for thing in cardsOfType(type):
+            thing.modPower(n)
+            modified.add(thing)
     else:
         card.modPower(n)
+        modified.add(card)
 
 #------------------------------------------------------------------------------
 # Sacrifice a permanent
 #------------------------------------------------------------------------------
 def sacrifice(card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
         remove = list()
-        for thing in field:
-            if type in thing.type():
-                thing.move(Card.GRAVEYARD)
-                remove.append(thing)
+        for thing in cardsOfType(type):
+            thing.move(Card.GRAVEYARD)
+            remove.append(thing)
+        removeFromField(remove)
         for thing in remove:
-            field.remove(thing)
-            if not Card.TOKEN in thing.type() and thing != commander:
-                grave.insert(0, thing)
+            if not Card.TOKEN in thing.type() and thing is not commander:
+                grave.appendleft(thing)
     else:
         card.move(Card.GRAVEYARD)
         field.remove(card)
-        if not Card.TOKEN in card.type() and card != commander:
-            grave.insert(0, card)
+        if not Card.TOKEN in card.type() and card is not commander:
+            grave.appendleft(card)
 #------------------------------------------------------------------------------
 # Scry n cards.
 #------------------------------------------------------------------------------
 def scry(n):
-    print "Not yet implemented"
+    print("Not yet implemented")
     
 #------------------------------------------------------------------------------    
-# Shuffle your library
+# Shuffle your library. This only marks it as shuffled, the cards get
+# rearranged by settleLibrary the next time their order matters.
 #------------------------------------------------------------------------------
 def shuffle():
-    random.shuffle(library)
+    global unshuffled
+    unshuffled = True
+
+#------------------------------------------------------------------------------
+# Actually shuffles the library if it's been shuffled since the last time the
+# order of the cards mattered. Call this before looking at or taking cards from
+# the library.
+#------------------------------------------------------------------------------
+def settleLibrary():
+    global unshuffled
+    if unshuffled:
+        # Shuffling needs to get at cards in the middle, which is slow in a deque
+        cards = list(library)
+        random.shuffle(cards)
+        library.clear()
+        library.extend(cards)
+        unshuffled = False
 
 #------------------------------------------------------------------------------
 # Taps a card on the battlefield
 #------------------------------------------------------------------------------
 def tap(card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
-        for thing in field:
-            if type in thing.type():
-                thing.tap()
+        for thing in cardsOfType(type):
+            thing.tap()
     else:
         card.tap()
     
@@ -1271,33 +1301,34 @@ def tap(card):
 # Look at the top n cards of your library, and put them back in any order?
 #------------------------------------------------------------------------------
 def top(n):
+    settleLibrary()
     if n > len(library):
         n = len(library)
     for i in range(0, n):
-        print library[i].name()
+        print(library[i].name())
 
 #------------------------------------------------------------------------------
 # Adds n toughness to a card until end of turn. n can be negative
 #------------------------------------------------------------------------------
 def toughness(n, card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
-        for thing in field:
-            if type in thing.type():
-                thing.modToughness(n)
+        for thing in cardsOfType(type):
+            thing.modToughness(n)
+            modified.add(thing)
     else:
         card.modToughness(n)
+        modified.add(card)
 
 #------------------------------------------------------------------------------
 # Untaps a specific card
 # card = card to untap
 #------------------------------------------------------------------------------
 def untap(card):
-    if card in Card.TYPES:
+    if card in Card.TYPES_SET:
         type = card
-        for thing in field:
-            if type in thing.type():
-                thing.untap()
+        for thing in cardsOfType(type):
+            thing.untap()
     else:
         card.untap()
 
@@ -1306,7 +1337,7 @@ def untap(card):
 #------------------------------------------------------------------------------
 def untapAll():
     for card in field:
-        if not card.name() + " doesn't untap during your untap step" in card.rulestext():
+        if not card.doesntUntap():
             card.untap()
 
 #------------------------------------------------------------------------------
@@ -1318,7 +1349,7 @@ def view(cardArgs):
         card = getCard(cardArgs, zone=field)
     except CardNotFoundError:
         card = getCard(cardArgs)
-    print card
+    print(card)
     
     
     
@@ -1328,740 +1359,807 @@ def view(cardArgs):
 #                                                                             #
 ###############################################################################
 
-#------------------------------------------------------------------------------
-# This function deals with I/O for command handling. It checks what command was
-# entered and parses arguments appropriately to extract information from the
-# user. After doing this, it calls the relevant function, passing it whatever
-# it needs to run.
-#------------------------------------------------------------------------------
-def command(cmd, args):
-    global turn
-    global combat
-
-
 #------------------------------------------------------------------------------
 # Bounce
 #
 #         Syntax: bounce <card>
-#-------#
-        # Returns a card from the battlefield to your hand.
-        #----------------------------------------------------------------------
-    if cmd == "bounce":
-        if args and len(args) >= 1:
-            card = getCard(args, field)
-            bounce(card)
-        else:
-            raise CommandError
+#
+# Returns a card from the battlefield to your hand.
+#------------------------------------------------------------------------------
+def commandBounce(cmd, args):
+    if args:
+        card = getCard(args, field)
+        bounce(card)
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Combat
 #
 #         Syntax: combat <card>
-#-------#
-        # Attacks with all specified creatures, dealing damage appropriately.
-        # You can specify "all" to attack with all creatures.
-        #----------------------------------------------------------------------
-    if cmd == "combat":
-        # Can only attack if we haven't had a combat phase yet. Usually.
-        if not combat:
-            input = "combat"
-            # List of attackers
-            attackers = list()
-            input = raw_input("Select attackers: ")
-            while input != "":
-                args = input.split(" ")
-                if args[0].lower() == "all" and len(args) == 1:
-                    for card in field:
-                        # Add all creatures that are not tapped or affected by summoning sickness
-                        if Card.CREATURE in card.type() and not card.summonSick() and not card.tapped():
-                            # Oh and also that aren't already declared as attackers this turn
-                            if card not in attackers:
-                                attackers.append(card)
-                    # Specified all, no need to wait on input.
-                    break
-                else:
-                    card = getCard(args, field)
-                    # Card isn't a creature
-                    if not Card.CREATURE in card.type():
-                        print card.name() + " isn't a creature."
-                    # Card is a creature but has summoning sickness
-                    elif card.summonSick():
-                        print card.name() + " has summoning sickness and can't attack this turn."
-                    # Card is a creature and doesn't have summoning sickness, but is tapped
-                    elif card.tapped():
-                        print card.name() + " is tapped and can't attack"
-                    # Last check, have they already declared this creature as an attacker this turn?
-                    elif card not in attackers:
-                        attackers.append(card)
-                    # Start of the next iteration
-                    input = raw_input("Select attackers: ")
-            # Assuming that we have attacking creatures this turn,
-            # tell them what all they chose and ask for confirmation.
-            if attackers:
-                # Blank line for pretty output
-                print ""
-                sys.stdout.write("Attacking with " + str(len(attackers)) + " creature")
-                if len(attackers) > 1:
-                    sys.stdout.write("s")
-                print ":\n"
-                for creature in attackers:
-                    print creature.name() + " (" + str(creature.power()) + "/" + str(creature.toughness()) + ")"
-                # Another blank line for pretty output
-                print ""
-                input = raw_input("Continue with attack? (y/n): ")
-                while input.lower() != "no" and input.lower() != "n":
-                    if input.lower() == "y" or input.lower() == "yes":
-                        attack(attackers)
-                        # Combat step has been used this turn. Gone until extra combat steps can be added.
-                        #combat = True
-                        return True
-                    input = raw_input("Continue with attack? (y/n): ")
+#
+# Attacks with all specified creatures, dealing damage appropriately.
+# You can specify "all" to attack with all creatures.
+#------------------------------------------------------------------------------
+def commandCombat(cmd, args):
+    # Can only attack if we haven't had a combat phase yet. Usually.
+    if not combat:
+        # List of attackers, and a set of them for quick checks
+        attackers = list()
+        declared = set()
+        answer = input("Select attackers: ").lower()
+        while answer != "":
+            args = answer.split(" ")
+            if args[0] == "all" and len(args) == 1:
+                for card in field:
+                    # Add all creatures that are not tapped or affected by summoning sickness
+                    if Card.CREATURE in card.type() and not card.summonSick() and not card.tapped():
+                        # Oh and also that aren't already declared as attackers this turn
+                        if card not in declared:
+                            attackers.append(card)
+                            declared.add(card)
+                # Specified all, no need to wait on input.
+                break
             else:
-                print "No attackers selected"
-                return False
+                card = getCard(args, field)
+                # Card isn't a creature
+                if not Card.CREATURE in card.type():
+                    print(f"{card.name()} isn't a creature.")
+                # Card is a creature but has summoning sickness
+                elif card.summonSick():
+                    print(f"{card.name()} has summoning sickness and can't attack this turn.")
+                # Card is a creature and doesn't have summoning sickness, but is tapped
+                elif card.tapped():
+                    print(f"{card.name()} is tapped and can't attack")
+                # Last check, have they already declared this creature as an attacker this turn?
+                elif card not in declared:
+                    attackers.append(card)
+                    declared.add(card)
+                # Start of the next iteration
+                answer = input("Select attackers: ").lower()
+        # Assuming that we have attacking creatures this turn,
+        # tell them what all they chose and ask for confirmation.
+        if attackers:
+            # Blank line for pretty output
+            print("")
+            sys.stdout.write("Attacking with " + str(len(attackers)) + " creature")
+            if len(attackers) > 1:
+                sys.stdout.write("s")
+            print(":\n")
+            for creature in attackers:
+                print(f"{creature.name()} ({creature.power()}/{creature.toughness()})")
+            # Another blank line for pretty output
+            print("")
+            answer = input("Continue with attack? (y/n): ").lower()
+            while answer != "no" and answer != "n":
+                if answer == "y" or answer == "yes":
+                    attack(attackers)
+                    # Combat step has been used this turn. Gone until extra combat steps can be added.
+                    #combat = True
+                    return True
+                answer = input("Continue with attack? (y/n): ").lower()
         else:
-            print "You've already used your combat step this turn."
+            print("No attackers selected")
             return False
+    else:
+        print("You've already used your combat step this turn.")
+        return False
+    return True
 
 #------------------------------------------------------------------------------
 # Copy
 #
 #         Syntax: copy <card>
-#-------#
-        # Creates a token that is a copy of a card on the battlefield and puts
-        # it onto the battlefield.
-        #----------------------------------------------------------------------
-    if cmd == "copy":
-        if args and len(args) >= 1:
-            card = getCard(args, zone=field)
-            copy(card)
-        else:
-            raise CommandError
+#
+# Creates a token that is a copy of a card on the battlefield and puts
+# it onto the battlefield.
+#------------------------------------------------------------------------------
+def commandCopy(cmd, args):
+    if args:
+        card = getCard(args, zone=field)
+        copy(card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Count
 #
 #         Syntax: count
-#-------#
-        # Utility function to display how many cards of each type are in the
-        # the deck. This will NOT include cards with multiple types in all of
-        # the relevant lists. Types are prioritized in the order
-        # Creatures, planeswalkers, enchantments, artifacts, lands, instants,
-        # and sorceries. For example, artifact creatures will only appear in
-        # the count for creatures, not in artifacts, or both. Only the number
-        # of cards in each type will be printed, not the cards themselves.
-        #----------------------------------------------------------------------
-    if cmd == "count":
-        if not args:
-            print ""
-            used = list()
+#
+# Utility function to display how many cards of each type are in the
+# the deck. This will NOT include cards with multiple types in all of
+# the relevant lists. Types are prioritized in the order
+# Creatures, planeswalkers, enchantments, artifacts, lands, instants,
+# and sorceries. For example, artifact creatures will only appear in
+# the count for creatures, not in artifacts, or both. Only the number
+# of cards in each type will be printed, not the cards themselves.
+#------------------------------------------------------------------------------
+def commandCount(cmd, args):
+    if not args:
+        print("")
+        # Each card counts towards the first of its types
+        counts = dict((type, 0) for type in Card.TYPES)
+        for card in deck:
+            typeMask = card.typeMask()
             for type in Card.TYPES:
-                number = 0
-                for card in deck:
-                    counted = False
-                    if type in card.type():
-                        for usedtype in used:
-                            if usedtype in card.type():
-                                counted = True
-                        if not counted:
-                            number += 1
-                string = type
-                for i in range(len(type), 14):
-                    string += " "
-                string += str(number)
-                print string
-            print ""
-            return False
-        else:
-            raise CommandError
+                if typeMask & Card.TYPE_BITS[type]:
+                    counts[type] += 1
+                    break
+        for type in Card.TYPES:
+            print(type.ljust(14) + str(counts[type]))
+        print("")
+        return False
+    else:
+        raise CommandError
 
 #------------------------------------------------------------------------------
 # Counters
 #
 #         Syntax: counters <n> <card>
-#-------#
-        # Adds n counters to a card.
-        #----------------------------------------------------------------------
-    if cmd == "counters":
-        if args and len(args) >= 2:
-            try:
-                n = int(args[0])
-            except ValueError:
-                raise CommandError
-            card = getCard(args[1:], zone=field)
-            counters(n, card)
-        else:
+#
+# Adds n counters to a card.
+#------------------------------------------------------------------------------
+def commandCounters(cmd, args):
+    if args and len(args) >= 2:
+        try:
+            n = int(args[0])
+        except ValueError:
             raise CommandError
+        card = getCard(args[1:], zone=field)
+        counters(n, card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Discard
 #
 #         Syntax: discard <card>
-#-------#
-        # Discard a card from your hand.
-        #----------------------------------------------------------------------
-    if cmd == "discard":
-        if args and len(args) >= 1:
-            card = getCard(args, zone=hand)
-            discard(card)
-        else:
-            raise CommandError
-        
+#
+# Discard a card from your hand.
+#------------------------------------------------------------------------------
+def commandDiscard(cmd, args):
+    if args:
+        card = getCard(args, zone=hand)
+        discard(card)
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Do
 #
 #         Syntax: do <n> <command> <args>
-#-------#
-        # Repeatedly executes <command> with arguments <args>, up to <n> times.
-        #----------------------------------------------------------------------
-    if cmd == "do":
-        if args:
-            try:
-                n = int(args[0])
-            except ValueError:
-                raise CommandError
-            thing = args[1]
-            args = args[2:]
-            do(thing, args, n)
-        
+#
+# Repeatedly executes <command> with arguments <args>, up to <n> times.
+#------------------------------------------------------------------------------
+def commandDo(cmd, args):
+    if args:
+        try:
+            n = int(args[0])
+        except ValueError:
+            raise CommandError
+        thing = args[1]
+        args = args[2:]
+        do(thing, args, n)
+    return True
+
 #------------------------------------------------------------------------------
 # Draw
 #
 #         Syntax: draw <number>
-#-------#
-        # Draws <number> cards from the top of your library.
-        #----------------------------------------------------------------------
-    if cmd == "draw":
-        if args and len(args) == 1:
-            try:
-                draw(int(args[0]))
-            except ValueError:
-                raise CommandError
-        elif not args or len(args) == 0:
-            draw(1)
-        else:
+#
+# Draws <number> cards from the top of your library.
+#------------------------------------------------------------------------------
+def commandDraw(cmd, args):
+    if args and len(args) == 1:
+        try:
+            draw(int(args[0]))
+        except ValueError:
             raise CommandError
+    elif not args:
+        draw(1)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Emblem
 #
 #         Syntax: emblem <planeswalker>
-#-------#
-        # Puts the emblem for the specified planeswalker in play.
-        #----------------------------------------------------------------------
-    if cmd == "emblem":
-        if args and len(args) >= 1:
-            card = getCard(args, emblems)
-            token = card.copy()
-            field.append(token)
-            token.move(Card.BATTLEFIELD)
-        else:
-            raise CommandError
+#
+# Puts the emblem for the specified planeswalker in play.
+#------------------------------------------------------------------------------
+def commandEmblem(cmd, args):
+    if args:
+        card = getCard(args, emblems)
+        enterBattlefield(card.copy())
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # End
 #
 #         Syntax: end
-#-------#
-        # Ends the turn, removing all temporary power/toughness modifiers.
-        #----------------------------------------------------------------------
-    if cmd == "end":
-        if not args:
-            endTurn()
-        else:
-            raise CommandError
+#
+# Ends the turn, removing all temporary power/toughness modifiers.
+#------------------------------------------------------------------------------
+def commandEnd(cmd, args):
+    if not args:
+        endTurn()
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Exile
 #
 #         Syntax: exile <card>
-#-------#
-        # Exiles a card in play.
-        #----------------------------------------------------------------------
-    if cmd == "exile":
-        if args and len(args) >= 1:
-            card = getCard(args, field)
-            exile(card)
-        else:
-            raise CommandError
+#
+# Exiles a card in play.
+#------------------------------------------------------------------------------
+def commandExile(cmd, args):
+    if args:
+        card = getCard(args, field)
+        exile(card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Facedown
 #
 #         Syntax: facedown <card>
-#-------#
-        # Turns a face up card face down.
-        #----------------------------------------------------------------------
-    if cmd == "facedown":
-        if args and len(args) >= 1:
-            card = getCard(args, field)
-            if not card.facedown():
-                card.morph()
-            else:
-                print card.name() + " is already face down."
+#
+# Turns a face up card face down.
+#------------------------------------------------------------------------------
+def commandFacedown(cmd, args):
+    if args:
+        card = getCard(args, field)
+        if not card.facedown():
+            card.morph()
         else:
-            raise CommandError
+            print(f"{card.name()} is already face down.")
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Faceup
 #
 #         Syntax: faceup <card>
-#-------#
-        # Turns a face down card face up.
-        #----------------------------------------------------------------------
-    if cmd == "faceup":
-        if args and len(args) >= 1:
-            card = getCard(args, field)
-            if card.facedown():
-                card.morph()
-                if Card.MEGAMORPH in card.keywords():
-                    plusone(1, card)
-            else:
-                print card.name() + " is already face up."
+#
+# Turns a face down card face up.
+#------------------------------------------------------------------------------
+def commandFaceup(cmd, args):
+    if args:
+        card = getCard(args, field)
+        if card.facedown():
+            card.morph()
+            if card.hasKeyword(Card.MEGAMORPH):
+                plusone(1, card)
         else:
-            raise CommandError
-            
+            print(f"{card.name()} is already face up.")
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Fetch
 #
 #         Syntax: draw <number>
-#-------#
-        # Fetches a specific card from your library, putting it in your hand.
-        #----------------------------------------------------------------------
-    if cmd == "fetch":
-        if args:
-            fetch(args)
-        else:
-            raise CommandError
+#
+# Fetches a specific card from your library, putting it in your hand.
+#------------------------------------------------------------------------------
+def commandFetch(cmd, args):
+    if args:
+        fetch(args)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Keywords
 #
+#         Syntax: keywords <card>
+#
+# Lists the keywords a card has.
+#------------------------------------------------------------------------------
+def commandKeywords(cmd, args):
+    if args:
+        card = getCard(args, field)
+        if card.keywords():
+            for keyword in card.keywords():
+                print(keyword)
+        else:
+            print("None")
+        return False
+    else:
+        raise CommandError
+
+#------------------------------------------------------------------------------
+# Keyword
+#
 #         Syntax: <keyword> <card>
-#-------#
-        # Grants a card a keyword until end of turn.
-        #----------------------------------------------------------------------
-    if cmd.lower() == "first" or cmd.lower() == "double":
-        if args and args[0].lower() == "strike":
+#
+# Grants a card a keyword until end of turn, then lists its keywords.
+#------------------------------------------------------------------------------
+def commandGrantKeyword(cmd, args):
+    if cmd == "first" or cmd == "double":
+        if args and args[0] == "strike":
             cmd += " strike"
             args = args[1:]
-    keyword = cmd.capitalize()
-    if keyword in Card.KEYWORDS:
+    # Commands are already lowercase, so look them up by lowercase name
+    keyword = Card.KEYWORD_NAMES.get(cmd)
+    if keyword and args:
         card = getCard(args, field)
-        if card:
-            card.modKeywords(keyword)
-            boardstate()
-            cmd = "keywords"
-    if cmd == "keywords":
-        if args:
-            card = getCard(args, field)
-            if card:
-                if card.keywords():
-                    for keyword in card.keywords():
-                        print keyword
-                else:
-                    print "None"
-                return False
-        else:
-            raise CommandError
-                    
+        card.modKeywords(keyword)
+        modified.add(card)
+        boardstate()
+        return commandKeywords(cmd, args)
+    else:
+        raise CommandError
+
 #------------------------------------------------------------------------------
 # Kill
 #
 #         Syntax: kill <card>
-#-------#
-        # Kills a card on the field, sending it to the graveyard.
-        #----------------------------------------------------------------------
-    if cmd == "kill":
-        if args:
-            card = getCard(args, zone=field)
-            kill(card)
-        else:
-            raise CommandError
+#
+# Kills a card on the field, sending it to the graveyard.
+#------------------------------------------------------------------------------
+def commandKill(cmd, args):
+    if args:
+        card = getCard(args, zone=field)
+        kill(card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Load
 #
 #         Syntax: load <decklist>
-#-------#
-        # Loads a new decklist into the playtester without having to exit it.
-        #----------------------------------------------------------------------
-    if cmd == "load":
-        global commander
-        global DECK_SIZE
-        if args and len(args) == 1:
-            del deck[:]
-            commander = False
-            DECK_SIZE = 60
-            load(args[0])
-            reset()
-        else:
-            raise CommandError
+#
+# Loads a new decklist into the playtester without having to exit it.
+#------------------------------------------------------------------------------
+def commandLoad(cmd, args):
+    global commander
+    global DECK_SIZE
+    if args and len(args) == 1:
+        del deck[:]
+        commander = False
+        DECK_SIZE = 60
+        load(args[0])
+        reset()
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Mill
 #
 #         Syntax: mill <n>
-#-------#
-        # Mills the top n cards of your library, sending them to the graveyard.
-        #----------------------------------------------------------------------
-    if cmd == "mill":
-        if args and len(args) == 1:
-            try:
-                mill(int(args[0]))
-            except ValueError:
-                raise CommandError
-        else:
+#
+# Mills the top n cards of your library, sending them to the graveyard.
+#------------------------------------------------------------------------------
+def commandMill(cmd, args):
+    if args and len(args) == 1:
+        try:
+            mill(int(args[0]))
+        except ValueError:
             raise CommandError
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Mod (player stats)
 #
 #         Syntax: p1 <command> <value>
-#-------#
-        # Modifies life total, poison counters, or commander damage on a
-        # player. Adding commander damage automatically decreases life total.
-        #----------------------------------------------------------------------
-    if cmd == "p1" or cmd == "p2":
-        if args and len(args) == 2:
-            try:
-                n = int(args[1])
-                stat = args[0]
-                if stat != "life" and stat != "poison" and stat != "commander":
-                    raise ValueError
-            except ValueError:
-                raise CommandError
-            modStat(cmd, stat, n)
-        else:
+#
+# Modifies life total, poison counters, or commander damage on a
+# player. Adding commander damage automatically decreases life total.
+#------------------------------------------------------------------------------
+def commandStat(cmd, args):
+    if args and len(args) == 2:
+        try:
+            n = int(args[1])
+            stat = args[0]
+            if stat not in PLAYER_STATS:
+                raise ValueError
+        except ValueError:
             raise CommandError
+        modStat(cmd, stat, n)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Morph
 #
 #         Syntax: morph <card>
-#-------#
-        # Plays a morph card from your hand, face down.
-        #----------------------------------------------------------------------
-    if cmd == "morph":
-        if args and len(args) >= 1:
-            card = getCard(args, hand)
-            if Card.MORPH or Card.MEGAMORPH in card.keywords():
-                play(card)
-                card.morph()
-            else:
-                print card.name() + " doesn't have morph."
-        
+#
+# Plays a morph card from your hand, face down.
+#------------------------------------------------------------------------------
+def commandMorph(cmd, args):
+    if args:
+        card = getCard(args, hand)
+        if card.isMorph():
+            play(card)
+            card.morph()
+        else:
+            print(f"{card.name()} doesn't have morph.")
+    return True
+
 #------------------------------------------------------------------------------
 # Move
 #
 #         Syntax: <from zone> <to zone> <card>
-#-------#
-        # Moves the specified card from one zone to another. Legal zones are:
-        #    field
-        #    hand
-        #    grave
-        #    exile
-        #    library      - Moving a card to library will automatically shuffle
-        #       top       - References the top card
-        #       bottom    - References the bottom card
-        #----------------------------------------------------------------------
-    if cmd == "move":
-        if args and len(args) >= 2:
-            fromZone = args[0]
-            toZone = args[1]
-            if args and len(args) == 2:
-                cardArgs = None
-            else:
-                cardArgs = args[2:]
-            move(fromZone, toZone, cardArgs)
+#
+# Moves the specified card from one zone to another. Legal zones are:
+#    field
+#    hand
+#    grave
+#    exile
+#    library      - Moving a card to library will automatically shuffle
+#       top       - References the top card
+#       bottom    - References the bottom card
+#------------------------------------------------------------------------------
+def commandMove(cmd, args):
+    if args and len(args) >= 2:
+        fromZone = args[0]
+        toZone = args[1]
+        if len(args) == 2:
+            cardArgs = None
         else:
-            raise CommandError
+            cardArgs = args[2:]
+        move(fromZone, toZone, cardArgs)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Mull
 #
 #         Syntax: mull
-#-------#
-        # Mulligans your opening hand, drawing one fewer cards than your
-        # previous hand size. If playing commander, the first mulligan is free.
-        # Additionally, if not playing commander, if a player has to mulligan,
-        # he or she will be given the opportunity to scry 1.
-        #----------------------------------------------------------------------
-    if cmd == "mull":
-        if not args:
-            mulligan()
-        else:
-            raise CommandError
-            
+#
+# Mulligans your opening hand, drawing one fewer cards than your
+# previous hand size. If playing commander, the first mulligan is free.
+# Additionally, if not playing commander, if a player has to mulligan,
+# he or she will be given the opportunity to scry 1.
+#------------------------------------------------------------------------------
+def commandMull(cmd, args):
+    if not args:
+        mulligan()
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Next
 #
 #         Syntax: next
-#-------#
-        # Move to the next turn. Untap all permanents and
-        # draw a card.
-        #----------------------------------------------------------------------
-    if cmd == "next":
-        if not args:
-            nextTurn()
-        else:
-            raise CommandError
-            
+#
+# Move to the next turn. Untap all permanents and
+# draw a card.
+#------------------------------------------------------------------------------
+def commandNext(cmd, args):
+    if not args:
+        nextTurn()
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Play
 #
 #         Syntax: play <card>
 #                 cast <card>
-#-------#
-        # The play command will play a card from the user's hand.
-        # The card will automatically move to the correct zone.
-        #----------------------------------------------------------------------
-    if cmd == "play" or cmd == "cast":
-        if args and len(args) >= 1:
-            cardname = " ".join(args)
-            card = None
-            if commander:
-                if (cardname.lower() == "commander" or cardname.lower() in commander.name().lower()) \
-                        and (commander in hand or commander.zone() == Card.COMMAND):
-                    card = commander
-            if not card:
-                if hand:
-                    card = getCard(args, zone=hand, cmd=cmd)
-                else:
-                    raise ZoneError("You have no cards in hand.")
-            if card == commander and (commander.zone() != Card.HAND and commander.zone() != Card.COMMAND):
-                raise ZoneError(commander.name() + " can't be played from " + commander.zone())
-            play(card)
-        else:
-            raise CommandError
+#
+# The play command will play a card from the user's hand.
+# The card will automatically move to the correct zone.
+#------------------------------------------------------------------------------
+def commandPlay(cmd, args):
+    if args:
+        cardname = " ".join(args)
+        card = None
+        if commander:
+            # The commander knows its own zone, no need to search the hand
+            if (cardname == "commander" or cardname in commander.nameLower()) \
+                    and (commander.zone() == Card.HAND or commander.zone() == Card.COMMAND):
+                card = commander
+        if not card:
+            if hand:
+                card = getCard(args, zone=hand, cmd=cmd)
+            else:
+                raise ZoneError("You have no cards in hand.")
+        if card is commander and (commander.zone() != Card.HAND and commander.zone() != Card.COMMAND):
+            raise ZoneError(commander.name() + " can't be played from " + commander.zone())
+        play(card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Plusone
 #
 #         Syntax: plusone <card>
-#-------#
-        # Adds a +1/+1 counter to a creature.
-        #----------------------------------------------------------------------
-    if cmd == "plusone":
-        if args and len(args) >= 2:
-            try:
-                n = int(args[0])
-            except ValueError:
-                raise CommandError
-            card = getCard(args[1:], zone=field)
-            plusone(n, card)
-        else:
+#
+# Adds a +1/+1 counter to a creature.
+#------------------------------------------------------------------------------
+def commandPlusone(cmd, args):
+    if args and len(args) >= 2:
+        try:
+            n = int(args[0])
+        except ValueError:
             raise CommandError
-            
+        card = getCard(args[1:], zone=field)
+        plusone(n, card)
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Power
 #
 #     Syntax: power <n> <card>
-#-------#
-        # Adds n power to a card. This effect ends at end of turn.
-        #----------------------------------------------------------------------
-    if cmd == "power":
-        if args and len(args) >= 2:
-            try:
-                n = int(args[0])
-            except ValueError:
-                raise CommandError
-            card = getCard(args[1:], zone=field)
-            power(n, card)
-        else:
+# Adds n power to a card. This effect ends at end of turn.
+#------------------------------------------------------------------------------
+def commandPower(cmd, args):
+    if args and len(args) >= 2:
+        try:
+            n = int(args[0])
+        except ValueError:
             raise CommandError
+        card = getCard(args[1:], zone=field)
+        power(n, card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Reset
 #
 #         Syntax: reset
-#-------#
-        # Reset the game
-        #----------------------------------------------------------------------
-    if cmd == "reset":
-        reset()
-        return False
+#
+# Reset the game
+#------------------------------------------------------------------------------
+def commandReset(cmd, args):
+    reset()
+    return False
 
 #------------------------------------------------------------------------------
 # Sacrifice
 #
 #         Syntax: sac <card>
-#-------#
-        # Sacrifice a permanent you control.
-        #----------------------------------------------------------------------
-    if cmd == "sac" or cmd == "crack":
-        if args:
-            card = getCard(args, field)
-            sacrifice(card)
-        else:
-            raise CommandError
+#
+# Sacrifice a permanent you control.
+#------------------------------------------------------------------------------
+def commandSacrifice(cmd, args):
+    if args:
+        card = getCard(args, field)
+        sacrifice(card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Shuffle
 #
 #         Syntax: shuffle
-#-------#
-        # Shuffle your library
-        #----------------------------------------------------------------------
-    if cmd == "shuffle":
-        shuffle()
+#
+# Shuffle your library
+#------------------------------------------------------------------------------
+def commandShuffle(cmd, args):
+    shuffle()
+    return True
 
 #------------------------------------------------------------------------------
 # Tap
 #
 #         Syntax: tap <card>
-#-------#
-        # Taps a single card. Tap will find the first untapped card it can.
-        #----------------------------------------------------------------------
-    if cmd == "tap":
-        if args:
-            try:
-                # If the last argument is an integer do nothing
-                int(args[-1])
-                args[-1] = int(args[-1])
-            except ValueError:
-                # If it's not append 1 to it. Same effect if they 
-                # didn't specify an int but it lets us iterate
-                # past already tapped cards.
-                args.append(1)
-            card = getCard(args, field)
-            if isinstance(card, Card):
-                prev = None
-                while card.tapped() and prev != card:
-                    prev = card
-                    args[-1] += 1
-                    card = getCard(args, field)
-            tap(card)
-        else:
-            raise CommandError
-            
+#
+# Taps a single card. Tap will find the first untapped card it can.
+#------------------------------------------------------------------------------
+def commandTap(cmd, args):
+    if args:
+        # Skip past cards that are already tapped
+        card = getCard(args, field, tapped=False)
+        tap(card)
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Token
 #
 #         Syntax: token <type>
-#-------#
-        # Puts a token onto the battlefield.
-        #----------------------------------------------------------------------
-    if cmd == "token":
-        if args and len(args) >= 1:
-            card = getCard(args, tokens)
-            token = card.copy()
-            token.move(Card.BATTLEFIELD)
-            field.append(token)
-        else:
-            raise CommandError
-            
+#
+# Puts a token onto the battlefield.
+#------------------------------------------------------------------------------
+def commandToken(cmd, args):
+    if args:
+        card = getCard(args, tokens)
+        enterBattlefield(card.copy())
+    else:
+        raise CommandError
+    return True
+
 #------------------------------------------------------------------------------
 # Top
 #
 #         Syntax: top <n>
-#-------#
-        # Look at the top n cards of your library, and put them back
-        # in any order?
-        #----------------------------------------------------------------------
-    if cmd == "top":
-        if not args:
-            n = 3
-        elif len(args) == 1:
-            try:
-                n = int(args[0])
-            except ValueError:
-                raise CommandError
-        else:
+#
+# Look at the top n cards of your library, and put them back
+# in any order?
+#------------------------------------------------------------------------------
+def commandTop(cmd, args):
+    if not args:
+        n = 3
+    elif len(args) == 1:
+        try:
+            n = int(args[0])
+        except ValueError:
             raise CommandError
-        top(n)
-        return False
+    else:
+        raise CommandError
+    top(n)
+    return False
 
 #------------------------------------------------------------------------------
 # Toughness
 #
 #         Syntax: toughness <n> <card>
-#-------#
-        # Adds n toughness to a card. This effect ends at end of turn.
-        #----------------------------------------------------------------------
-    if cmd == "toughness":
-        if args and len(args) >= 2:
-            try:
-                n = int(args[0])
-            except ValueError:
-                raise CommandError
-            card = getCard(args[1:], field)
-            toughness(n, card)
-        else:
+#
+# Adds n toughness to a card. This effect ends at end of turn.
+#------------------------------------------------------------------------------
+def commandToughness(cmd, args):
+    if args and len(args) >= 2:
+        try:
+            n = int(args[0])
+        except ValueError:
             raise CommandError
+        card = getCard(args[1:], field)
+        toughness(n, card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # Transform
 #
 #         Syntax: transform <card>
-#-------#
-        # Transforms a flip card.
-        #----------------------------------------------------------------------
-    if cmd == "transform":
-        if args:
-            card = getCard(args, field)
-            if card.isTransform() and card.zone() == Card.BATTLEFIELD:
-                card.transform()
-            else:
-                print card.name() + " can't transform."
-        
+#
+# Transforms a flip card.
+#------------------------------------------------------------------------------
+def commandTransform(cmd, args):
+    if args:
+        card = getCard(args, field)
+        if card.isTransform() and card.zone() == Card.BATTLEFIELD:
+            card.transform()
+        else:
+            print(f"{card.name()} can't transform.")
+    return True
+
 #------------------------------------------------------------------------------
 # Untap
 #
 #         Syntax: untap <card>
-#-------#
-        # Untaps a single card. Untap will find the first untapped card it can.
-        #----------------------------------------------------------------------
-    if cmd == "untap":
-        if args:
-            try:
-                # If the last argument is an integer do nothing
-                int(args[-1])
-                args[-1] = int(args[-1])
-            except ValueError:
-                # If it's not append 1 to it. Same effect if they 
-                # didn't specify an int but it lets us iterate
-                # past already tapped cards.
-                args.append(1)
-            card = getCard(args, field)
-            if isinstance(card, Card):
-                prev = None
-                while card.tapped() and prev != card:
-                    prev = card
-                    args[-1] += 1
-                    card = getCard(args, field)
-            untap(card)
-        else:
-            raise CommandError
+#
+# Untaps a single card. Untap will find the first tapped card it can.
+#------------------------------------------------------------------------------
+def commandUntap(cmd, args):
+    if args:
+        # Skip past cards that are already untapped
+        card = getCard(args, field, tapped=True)
+        untap(card)
+    else:
+        raise CommandError
+    return True
 
 #------------------------------------------------------------------------------
 # View
 #
 #         Syntax: view <card>
-#-------#
-        # The view command lets a user look at an image of a card
-        # Enclosing the card name in double quotes will fetch the
-        # exact card, otherwise the first card in the deck 
-        # containing the given string will be printed.
-        #----------------------------------------------------------------------
-    if cmd == "view":
-        if args:
-            view(args)
-            return False
-        else:
-            raise CommandError
+#
+# The view command lets a user look at an image of a card
+# Enclosing the card name in double quotes will fetch the
+# exact card, otherwise the first card in the deck
+# containing the given string will be printed.
+#------------------------------------------------------------------------------
+def commandView(cmd, args):
+    if args:
+        view(args)
+        return False
+    else:
+        raise CommandError
 
 #------------------------------------------------------------------------------
 # Quit
 #
 #         Syntax: quit
-#-------#
-        # Command to exit the program
-        #----------------------------------------------------------------------
-    if cmd == "quit":
-        sys.exit(0)
-    
-    # Return true to print the board state
-    return True
+#
+# Command to exit the program
+#------------------------------------------------------------------------------
+def commandQuit(cmd, args):
+    sys.exit(0)
+
+# Every command, and the function that handles it. Anything not in here
+# should be a keyword to give a card.
+COMMANDS = {"bounce": commandBounce,
+            "combat": commandCombat,
+            "copy": commandCopy,
+            "count": commandCount,
+            "counters": commandCounters,
+            "discard": commandDiscard,
+            "do": commandDo,
+            "draw": commandDraw,
+            "emblem": commandEmblem,
+            "end": commandEnd,
+            "exile": commandExile,
+            "facedown": commandFacedown,
+            "faceup": commandFaceup,
+            "fetch": commandFetch,
+            "keywords": commandKeywords,
+            "kill": commandKill,
+            "load": commandLoad,
+            "mill": commandMill,
+            "morph": commandMorph,
+            "move": commandMove,
+            "mull": commandMull,
+            "next": commandNext,
+            "p1": commandStat,
+            "play": commandPlay,
+            "plusone": commandPlusone,
+            "power": commandPower,
+            "quit": commandQuit,
+            "reset": commandReset,
+            "sac": commandSacrifice,
+            "shuffle": commandShuffle,
+            "tap": commandTap,
+            "token": commandToken,
+            "top": commandTop,
+            "toughness": commandToughness,
+            "transform": commandTransform,
+            "untap": commandUntap,
+            "view": commandView}
+# Other names for the same commands
+COMMANDS["cast"] = COMMANDS["play"]
+COMMANDS["crack"] = COMMANDS["sac"]
+COMMANDS["p2"] = COMMANDS["p1"]
+# Stats the p1 and p2 commands can change
+PLAYER_STATS = frozenset(("life", "poison", "commander"))
+# The only commands that still work once the game is over
+GAME_OVER_COMMANDS = frozenset(("reset", "quit", "view"))
+# Nothing longer than this can be a command or a keyword
+MAX_COMMAND_LENGTH = max(len(name) for name in list(COMMANDS) + list(Card.KEYWORD_NAMES))
+
+#------------------------------------------------------------------------------
+# This function deals with I/O for command handling. It checks what command was
+# entered and looks up the function that parses its arguments to extract
+# information from the user. That function then calls the relevant function,
+# passing it whatever it needs to run. Returns true if the board state should
+# be printed again.
+#------------------------------------------------------------------------------
+def command(cmd, args):
+    # Nothing entered, just print the board state again
+    if not cmd:
+        return True
+    if len(cmd) > MAX_COMMAND_LENGTH:
+        raise CommandError
+    handler = COMMANDS.get(cmd)
+    if handler:
+        return handler(cmd, args)
+    return commandGrantKeyword(cmd, args)
+
+# Commands that do iterates over cards, and the function that does the work
+BULK_OPS = {"counters": counters,
+            "plusone": plusone,
+            "power": power,
+            "toughness": toughness}
 
 #------------------------------------------------------------------------------
 # Do executes cmd n times with args as its arguments.
@@ -2076,18 +2174,32 @@ def command(cmd, args):
 # first card, which is now different than before, so it behaves the same way.
 #------------------------------------------------------------------------------
 def do(cmd, args, n):
-    iterate = ("counters", "power", "toughness", "plusone")
-    if cmd in iterate:
-        args.append(0)
-    for i in range(0, n):
-        if cmd in iterate:
-            # The +1 gets cut off later
-            args[-1] = i+1
-        # Copy the args so that the command doesn't screw it 
-        # up for the next iteration. Pretty much only happens
-        # with tap and untap.
-        copy = args[:]
-        command(cmd, copy)
+    bulk = BULK_OPS.get(cmd)
+    if bulk:
+        # These take <n> <card>, and each time through acts on the next card
+        # that matches. Find all of them at once instead of running the
+        # command n times.
+        if not args or len(args) < 2:
+            raise CommandError
+        try:
+            amount = int(args[0])
+        except ValueError:
+            raise CommandError
+        # The 1 keeps a number at the end of the name from being a skip
+        for card in getCard(args[1:] + [1], field, count=n):
+            bulk(amount, card)
+        return
+    global holdBoardstate
+    # Only the board after the last time through matters
+    held = holdBoardstate
+    holdBoardstate = True
+    try:
+        for i in range(0, n):
+            # No command changes its args, so the same list can be
+            # passed every time
+            command(cmd, args)
+    finally:
+        holdBoardstate = held
 
 ###############################################################################
 #                                                                             #
@@ -2105,7 +2217,7 @@ elif len(sys.argv) == 3 and sys.argv[1] == "debug":
     debug = True
     load(sys.argv[2])
 else:
-    print "Expected decklist file"
+    print("Expected decklist file")
     sys.exit(1)
 
 reset()
@@ -2116,19 +2228,17 @@ reset()
 # positive integer n to perform the action on the nth card that
 # action could legally be performed on.
 while 1:
-    # Check if anyone has won yet
-    checkVictory()
     try:
-        input = raw_input(">>").rstrip().lower()
-        args = input.split(" ")
-        cmd = args[0]
-        if len(args) >= 2:
-            args = args[1:]
+        line = input(">>").rstrip().lower()
+        # The command is everything before the first space
+        cmd, _, rest = line.partition(" ")
+        if rest:
+            args = rest.split(" ")
         else:
             args = None
         
         # Only allow running of reset, quit, and view when the game is over
-        if not GAME_OVER or cmd == "reset" or cmd == "quit" or cmd == "view":
+        if not GAME_OVER or cmd in GAME_OVER_COMMANDS:
             # Run the command
             state = command(cmd, args)
             # If we ran a command that needs to update the boardstate, do it
@@ -2137,12 +2247,16 @@ while 1:
                 stateBased()
                 boardstate()
         else:
-            print "Game finished."
+            print("Game finished.")
     except CardNotFoundError as err:
-        print "Failed to find \"" + err.args[0] + "\"."
+        print(f"Failed to find \"{err.args[0]}\".")
     except ZoneError as err:
-        print err.args[0]
+        print(err.args[0])
     except CommandError:
-        print "Invalid syntax for " + cmd
+        print(f"Invalid syntax for {cmd}")
+    except EOFError:
+        # End of input quits, same as the quit command
+        print("")
+        sys.exit(0)
     #except Exception as err:
     #    print err